@@ -11,9 +11,27 @@
 
 
 # Import libraries
-import pandas as pd
-import numpy as np
-import re
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    # Only needed for type annotations; keeps `import birds` lightweight
+    import pandas as pd
+
+# Name sanitization for feature class names (drop parentheses, spaces/hyphens to
+# underscores), built once at import
+_FC_TRANS = str.maketrans({"(": None, ")": None, " ": "_", "-": "_"})
+
+def formatName(name:str) -> str:
+    """
+    Formats a FeederWatch species name ("Woodpecker, Downy") for use in feature class
+    names ("Downy_Woodpecker").
+    Args
+    - name : The species name
+    Output
+    The formatted name
+    """
+    name_parts = name.split(', ')
+    return (name_parts[1] + "_" + name_parts[0]).translate(_FC_TRANS)
 
 class Species():
     """
@@ -21,18 +39,25 @@ class Species():
 
     Attributes:
     -----------
-    species_code : list
-        List of species codes.
-    species_name : list
-        List of species names.
-    family : list
-        List of families for each species.
+    species_code : numpy.ndarray
+        Array of species codes.
+    species_name : numpy.ndarray
+        Array of species names.
+    family : numpy.ndarray
+        Array of families for each species.
+    _by_name : dict
+        Lookup of species name to (species code, species name, family).
+    names : list
+        Unique species names (in order of first appearance).
         
     Parameters:
     -----------
     dataframe : pandas.DataFrame
         Raw FeederWatch dataframe containing information on bird species.
     """
+    # Fixed attribute set; no per-instance __dict__
+    __slots__ = ("species_code", "species_name", "family", "_by_name")
+
     def __init__(self, dataframe:pd.DataFrame) -> None:
         """
         Initialize Species class with the given FeederWatch dataframe.
@@ -42,9 +67,31 @@ class Species():
         dataframe : pandas.DataFrame
             Raw FeederWatch dataframe containing information on bird species.
         """
-        self.species_code = dataframe.species_code.to_list()
-        self.species_name = dataframe.species_name.to_list()
-        self.family = dataframe.family.to_list()
+        self.species_code = dataframe.species_code.to_numpy()
+        self.species_name = dataframe.species_name.to_numpy()
+        self.family = dataframe.family.to_numpy()
+        # Hash lookup by species name (avoids a linear scan for each Bird);
+        # the first row wins if a name is duplicated
+        self._by_name = dict()
+        for row in zip(self.species_code, self.species_name, self.family):
+            self._by_name.setdefault(row[1], row)
+
+    @property
+    def names(self) -> list:
+        """
+        Unique species names, in order of first appearance (same as 
+        `dataframe.species_name.unique()`), taken from the name lookup.
+        """
+        return list(self._by_name.keys())
+
+    def formattedNames(self) -> dict:
+        """
+        Formatted (feature class) names for every species, without creating a Bird 
+        per species.
+        Output
+        Dictionary of species name to formatted name (same as Bird.formatted_name)
+        """
+        return {name: formatName(str(name)) for name in self._by_name}
 
 class Bird(Species):
     """
@@ -65,35 +112,43 @@ class Bird(Species):
 
     Parameters:
     -----------
-    dataframe : pandas.DataFrame
-        Raw FeederWatch dataframe containing information on bird species.
+    dataframe : pandas.DataFrame or Species
+        Raw FeederWatch dataframe containing information on bird species, or a
+        previously built Species object (reused without rebuilding the lookup).
     bird_name : str
         Name of the bird species to create.
     _prefix : str, optional
         Prefix to be added to the feature class name attribute, by default "FW_".
     """
-    def __init__(self, dataframe:pd.DataFrame, bird_name:str, _prefix="FW_") -> None:
+    # `family` reuses the Species slot (holds the single family name for a Bird)
+    __slots__ = ("code", "name", "formatted_name", "fc_name")
+
+    def __init__(self, dataframe, bird_name:str, _prefix="FW_") -> None:
         """
         Initialize Bird class with the given FeederWatch dataframe, bird name, and prefix.
 
         Parameters:
         -----------
-        dataframe : pandas.DataFrame
-            Raw FeederWatch dataframe containing information on bird species.
+        dataframe : pandas.DataFrame or Species
+            Raw FeederWatch dataframe containing information on bird species, or a
+            previously built Species object (reused without rebuilding the lookup).
         bird_name : str
             Name of the bird species to create.
         _prefix : str, optional
             Prefix to be added to the feature class name attribute, by default "FW_".
         """
-        super().__init__(dataframe)
-        # Get index from original dataframe
-        bird_idx = np.array([bird_name == b for b in self.species_name])
-        # Create attributes
-        self.code = str(np.array(self.species_code)[bird_idx][0])
-        self.name = str(np.array(self.species_name)[bird_idx][0])
-        self.family = str(np.array(self.family)[bird_idx][0])
+        if isinstance(dataframe, Species):
+            # Share the already built species table/lookup
+            self.species_code = dataframe.species_code
+            self.species_name = dataframe.species_name
+            self._by_name = dataframe._by_name
+        else:
+            super().__init__(dataframe)
+        # Get row from original dataframe, create attributes
+        code, name, family = self._by_name[bird_name]
+        self.code = str(code)
+        self.name = str(name)
+        self.family = str(family)
         # Adjust name for formatted feature class name attribute
-        name_parts = self.name.split(', ')
-        self.formatted_name = re.sub("[()]", "", name_parts[1] + "_" + name_parts[0])\
-                .replace(" ", "_").replace("-", "_")
+        self.formatted_name = formatName(self.name)
         self.fc_name = f"{_prefix}{self.formatted_name}_NC"
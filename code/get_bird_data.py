@@ -21,10 +21,16 @@
 # 
 
 # import libraries
+from __future__ import annotations
 import pandas as pd
 import numpy as np
 import os
-import arcpy
+
+# Raw FeederWatch fields used by `cleanFeederWatchData()` (all others are skipped at read time)
+FW_RAW_FIELDS = ['latitude', 'longitude', 'subnational1_code', 'month', 'day', 'year',
+                 'species_code', 'how_many', 'valid', 'plus_code']
+# Data types of the cleaned FeederWatch data saved to/read from .csv files
+FW_DTYPES = {'species_code':'category', 'species_name':'category', 'subnational1_code':'category'}
 
 def getSpeciesCodes(data_path:str) -> pd.DataFrame:
     """
@@ -35,8 +41,9 @@ def getSpeciesCodes(data_path:str) -> pd.DataFrame:
     Args
     - data_path : The file path to the folder where the species_codes.csv will be saved.
     Output
-    A pandas dataframe containing species codes, names, and families.
+    A pandas dataframe containing species codes, names (categorical), and families (categorical).
     """
+    import arcpy
     # Checks to confirm valid file path
     if not os.path.exists(data_path):
         raise FileNotFoundError(f"Data path '{data_path}' not found.")
@@ -45,7 +52,7 @@ def getSpeciesCodes(data_path:str) -> pd.DataFrame:
     arcpy.AddMessage("Getting Species codes...")
     out_file_name = "species_codes.csv"
     outFile = os.path.join(data_path, out_file_name)
-    if out_file_name in os.listdir(data_path):
+    if os.path.isfile(outFile):
         species = pd.read_csv(outFile)
     else:
         # Credit goes to the following StackOverflow answer for re-formatting the url:
@@ -64,6 +71,9 @@ def getSpeciesCodes(data_path:str) -> pd.DataFrame:
         species.to_csv(outFile, index=False)
         print("Completed species code retrieval")
         arcpy.AddMessage("Completed species code retrieval")
+    # Categorical name/family columns (filters such as `family == ...` compare integer
+    # category codes rather than Python strings)
+    species = species.astype({'species_name':'category', 'family':'category'})
     return species
 
 def cleanFeederWatchData(data:pd.DataFrame, 
@@ -93,10 +103,12 @@ def cleanFeederWatchData(data:pd.DataFrame,
     data.rename(columns=str.lower, inplace=True)
     other_names = [n for n in all_names if n not in data.columns]
     data = data.assign(**{name:np.nan for name in other_names if len(other_names) > 0})
-    # Filter Data by valid, no plus_code, species, optional location
-    data = data.query(f'valid == 1 & plus_code != 1 & species_code == @birds.species_code.to_list()')
+    # Filter Data by valid, no plus_code, species, optional location (single combined mask)
+    mask = (data.valid == 1) & (data.plus_code != 1) & \
+        data.species_code.isin(set(birds.species_code))
     if sub_national_code is not None:
-        data = data.loc[data.subnational1_code.isin(sub_national_code)]
+        mask &= data.subnational1_code.isin(sub_national_code)
+    data = data.loc[mask]
     # Join with species (to get species name)
     data = pd.merge(data, birds, how='left', on='species_code')
     # Date formatting
@@ -135,6 +147,7 @@ def getFeederWatchData(outfile:str,
     - max_year: maximum year to filter data
     Returns a pandas dataframe of the selected FeederWatch bird data
     """
+    import arcpy
     print("Getting FeederWatch data...")
     arcpy.AddMessage("Getting FeederWatch data...")
     final_out_file = os.path.join(out_dir, outfile)
@@ -142,8 +155,7 @@ def getFeederWatchData(outfile:str,
     if os.path.isfile(final_out_file):
         print("Data already exists; Reading from csv...")
         arcpy.AddMessage("Data already exists; Reading from csv...")
-        out = pd.read_csv(final_out_file)
-        out['date'] = pd.to_datetime(out.date)
+        out = pd.read_csv(final_out_file, dtype=FW_DTYPES, parse_dates=['date'])
     else:
         print("Unable to find previously downloaded data; Querying data source by time frame...")
         arcpy.AddMessage("Unable to find previously downloaded data; Querying data source by time frame...")
@@ -158,7 +170,8 @@ def getFeederWatchData(outfile:str,
                 print(f"Getting {tf} data from {url}")
                 arcpy.AddMessage(f"Getting {tf} data from {url}")
                 # Read/Clean data
-                data = cleanFeederWatchData(data=pd.read_csv(url), 
+                data = cleanFeederWatchData(data=pd.read_csv(url, 
+                                                             usecols=lambda c: c.lower() in FW_RAW_FIELDS), 
                                             birds=birds, 
                                             sub_national_code=sub_national_code)
                 if save_:
@@ -169,8 +182,8 @@ def getFeederWatchData(outfile:str,
             else:
                 print(f"Reading {tf} data from {out_file}")
                 arcpy.AddMessage(f"Reading {tf} data from {out_file}")
-                data = pd.read_csv(out_file, compression='gzip')
-                data['date'] = pd.to_datetime(data.date)
+                data = pd.read_csv(out_file, compression='gzip', dtype=FW_DTYPES, 
+                                   parse_dates=['date'])
             # Append to list
             df_lis.append(data)
         # Combine list into single dataframe
@@ -178,8 +191,7 @@ def getFeederWatchData(outfile:str,
         arcpy.AddMessage("Concatenating list of dataframes")
         out = pd.concat(df_lis)
         # Filter by date
-        out = out[out['date'].dt.year >= min_year]
-        out = out[out['date'].dt.year <= max_year]
+        out = out.loc[out['date'].dt.year.between(min_year, max_year)]
         # Save to file
         out.to_csv(final_out_file, index=False)
     print("Completed FeederWatch data retrieval")
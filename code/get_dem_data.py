@@ -11,10 +11,50 @@
 # first time.
 
 # Import libraries
+from __future__ import annotations
 import os
-import arcpy
-import zipfile
-import urllib.request
+import shutil
+from tempfile import SpooledTemporaryFile
+from typing import TYPE_CHECKING
+from urllib.request import urlopen
+from zipfile import ZipFile
+if TYPE_CHECKING:
+    import arcpy
+
+def downloadDEMData(data_path:str) -> str:
+    """
+    MUST BE ON NCSU NETWORK (either on-campus or connected to VPN) if the data is being
+    downloaded for the first time.
+
+    Downloads and decompresses the 250m DEM data for North Carolina from 
+    https://gisdata.lib.ncsu.edu/DEM/nc250.zip if it is not already within data_path. No
+    geoprocessing is done here, so it can run in a worker thread alongside other downloads
+    (progress is only printed; arcpy messages are left to the caller on the main thread).
+    Args
+    - data_path : A file path to the data directory
+    Output
+    The path to the directory containing the extracted DEM
+    """
+    # Connect to NCSU network (on-campus or through VPN)
+    dem_path = os.path.join(data_path, "DEM/")
+    if not os.path.exists(dem_path):
+        os.makedirs(dem_path)
+    if not os.path.exists(os.path.join(dem_path, "nc250")):
+        # URL to the North Carolina boundary 250m DEM
+        url = "https://gisdata.lib.ncsu.edu/DEM/nc250.zip"
+        print(f"Downloading DEM Data from {url}...")
+        # Extract the contents of the zip file to a directory named `dem_path` (var)
+        # Credit to this method of unzipping a zip file goes to Shyamal Vaderia
+        # (see blog post at https://svaderia.github.io/articles/downloading-and-unzipping-a-zipfile/)
+        # (The response is streamed into a spooled buffer that stays in memory
+        # for small archives and spills to a temporary file past 128 MB)
+        with urlopen(url) as zipresp, SpooledTemporaryFile(max_size=128 << 20) as spool:
+            shutil.copyfileobj(zipresp, spool, 1 << 20)
+            spool.seek(0)
+            with ZipFile(spool) as zfile:
+                zfile.extractall(dem_path)
+        # End Credit
+    return dem_path
 
 def getDEMData(data_path:str, 
                wspace:str, 
@@ -37,6 +77,7 @@ def getDEMData(data_path:str,
     Output
     Returns the name of the Feature Layer added to the workspace (by default "nc250")
     """
+    import arcpy
     # Checks to confirm valid file paths
     if not os.path.exists(data_path):
         raise FileNotFoundError(f"Data path '{data_path}' not found.")
@@ -45,50 +86,20 @@ def getDEMData(data_path:str,
     
     print("Getting explanatory DEM...")
     arcpy.AddMessage("Getting explanatory DEM...")
-    # Connect to NCSU network (on-campus or through VPN)
     # Set workspace
     arcpy.env.workspace = wspace
-    dem_path = os.path.join(data_path, "DEM/")
-    if not os.path.exists(dem_path):
-        os.makedirs(dem_path)
-    if "nc250" not in os.listdir(dem_path):
-        # URL to the North Carolina boundary 250m DEM
-        url = "https://gisdata.lib.ncsu.edu/DEM/nc250.zip"
-        print(f"Downloading DEM Data from {url}...")
-        arcpy.AddMessage(f"Downloading DEM Data from {url}...")
-        zip_file_name = "nc250.zip"
-        # Extract the contents of the zip file to a directory named `dem_path` (var)
-        # Credit to this method of unzipping a zip file goes to Shyamal Vaderia
-        # (see blog post at https://svaderia.github.io/articles/downloading-and-unzipping-a-zipfile/)
-        urllib.request.urlretrieve(url, zip_file_name)
-        with zipfile.ZipFile(zip_file_name, 'r') as zip_ref:
-            zip_ref.extractall(dem_path)
-        # End Credit
-    if "nc250.zip" in os.listdir():
-        print("Removing nc250.zip...")
-        arcpy.AddMessage("Removing nc250.zip...")
-        os.remove("nc250.zip")
-            
-    if fc_name not in arcpy.ListRasters():
-        arcpy.management.CopyRaster(os.path.join(dem_path, "nc250"), f"{fc_name}_base")
-
-        # Reproject the input raster if the spatial references do not match
-        arcpy.ProjectRaster_management(f"{fc_name}_base", f"{fc_name}_projected", coord_sys)
-
-        # Get the mask polygon's extent
-        mask_polygon_extent = arcpy.Describe(nc_boundary).extent
-
-        # Set the output extent to match the mask polygon's extent
-        arcpy.env.extent = mask_polygon_extent
-
-        out_dem = arcpy.sa.ExtractByMask(f"{fc_name}_projected", nc_boundary)
-        out_dem.save(fc_name)
-
-        arcpy.env.extent = "MAXOF"
+    # Download (if needed)
+    dem_path = downloadDEMData(data_path)
 
-        # Delete unneeded rasters
-        for ras in [f"{fc_name}_projected", f"{fc_name}_base"]:
-            arcpy.Delete_management(ras)
+    if not arcpy.Exists(fc_name):
+        # Project and clip in a single pass, using all cores; ExtractByMask honors the
+        # output coordinate system and extent environments, so no intermediate rasters
+        # are written, and EnvManager restores the previous settings on exit
+        with arcpy.EnvManager(outputCoordinateSystem=coord_sys,
+                              extent=arcpy.Describe(nc_boundary).extent,
+                              parallelProcessingFactor="100%"):
+            out_dem = arcpy.sa.ExtractByMask(os.path.join(dem_path, "nc250"), nc_boundary)
+            out_dem.save(fc_name)
 
     print("Completed retrieval of explanatory DEM")
     arcpy.AddMessage("Completed retrieval of explanatory DEM")
@@ -10,11 +10,126 @@
 
 
 # import libraries
+from __future__ import annotations
 import os
-import arcpy 
-from io import BytesIO
-from urllib.request import urlopen
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from typing import TYPE_CHECKING, BinaryIO
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
 from zipfile import ZipFile
+if TYPE_CHECKING:
+    import arcpy
+
+# Number of concurrent byte-range requests used for large downloads
+DOWNLOAD_PARTS = 4
+# Documentation files in the NLCD archive that are not needed to read the raster
+NLCD_SKIP_EXTS = ('.pdf', '.htm', '.html', '.txt', '.doc', '.docx')
+
+def fetchRange(url:str, 
+               start:int, 
+               end:int, 
+               out_file:BinaryIO, 
+               lock:threading.Lock) -> bool:
+    """
+    Downloads bytes start-end (inclusive) of url, writing them at the same offset of
+    out_file.
+    Args
+    - url : The URL to download
+    - start : The first byte of the range
+    - end : The last byte of the range
+    - out_file : An open, seekable binary file shared by all ranges
+    - lock : A lock guarding seek + write on out_file
+    Output
+    False (with nothing written) if the server did not honor the range request, else True
+    """
+    with urlopen(Request(url, headers={"Range": f"bytes={start}-{end}"})) as resp:
+        if resp.status != 206:
+            return False
+        offset = start
+        while chunk := resp.read(1 << 20):
+            with lock:
+                out_file.seek(offset)
+                out_file.write(chunk)
+            offset += len(chunk)
+    return True
+
+def fetchFile(url:str, out_file:BinaryIO, parts:int=DOWNLOAD_PARTS) -> None:
+    """
+    Downloads url to out_file. If the server accepts byte-range requests, the file is
+    fetched as `parts` ranges concurrently; otherwise (or if a range request is not 
+    honored) it is streamed in 1 MB chunks.
+    Args
+    - url : The URL to download
+    - out_file : An open, seekable binary file (rewound to the start when finished)
+    - parts : The number of concurrent range requests
+    """
+    try:
+        with urlopen(Request(url, method="HEAD")) as head:
+            size = int(head.headers.get("Content-Length") or 0)
+            ranges = head.headers.get("Accept-Ranges", "").lower() == "bytes"
+    except HTTPError:
+        # HEAD not allowed; use a single stream
+        size, ranges = 0, False
+    if ranges and size >= parts << 20:
+        # Ranges are written out of order; a spooled buffer would otherwise allocate 
+        # everything up to the highest offset in memory before rolling over to disk
+        if hasattr(out_file, "rollover"):
+            out_file.rollover()
+        lock = threading.Lock()
+        step = -(-size // parts)
+        with ThreadPoolExecutor(max_workers=parts) as executor:
+            fetches = [executor.submit(fetchRange, url, lo, min(lo + step, size) - 1, out_file, lock) 
+                       for lo in range(0, size, step)]
+            ranges = all([fetch.result() for fetch in fetches])
+        if not ranges:
+            # Range support is optional; discard any partial ranges and fall back
+            out_file.seek(0)
+            out_file.truncate()
+    if not ranges or size < parts << 20:
+        with urlopen(url) as resp:
+            shutil.copyfileobj(resp, out_file, 1 << 20)
+    out_file.seek(0)
+
+def downloadLandCoverData(data_path:str) -> str:
+    """
+    Downloads and decompresses the 2019 NLCD land cover raster data for North Carolina
+    if it is not already within data_path. No geoprocessing is done here, so it can run
+    in a worker thread alongside other downloads (progress is only printed; arcpy
+    messages are left to the caller on the main thread).
+    Args
+    - data_path : File path to the data directory.
+    Output
+    The path to the directory containing the extracted land cover data
+    """
+    # https://www.lib.ncsu.edu/gis/nlcd
+    raster_path = os.path.join(data_path, "NC_Land_Cover/")
+    if not os.path.isdir(raster_path):
+        # 2019 only 
+        zipurl = 'https://gisdata.lib.ncsu.edu/fedgov/mrlc/nlcd2019/NC_NLCD2019only.zip'
+        print(f"Downloading land cover data from {zipurl}...")
+        # 2001 - 2019, every 3 years (NOT IN USE)
+        # "https://drive.google.com/uc?id=1555Ox4664hH0kFlakGQwi1nzxrMcC61o&confirm=t&uuid=0edbf032-c3ba-45fe-b111-c3752b7cf8ae&at=ALgDtsw-mvJqXBLq4JMNZJ-5g2b7:1676943369421"
+        
+        # Credit to this method of unzipping a zip file goes to Shyamal Vaderia
+        # (see blog post at https://svaderia.github.io/articles/downloading-and-unzipping-a-zipfile/)
+        # (The archive is fetched in concurrent byte ranges when supported, into a spooled 
+        # buffer that stays in memory for small archives and spills to a temporary file 
+        # past 128 MB)
+        with SpooledTemporaryFile(max_size=128 << 20) as spool:
+            fetchFile(zipurl, spool)
+            with ZipFile(spool) as zfile:
+                zfile.extractall(raster_path, 
+                                 members=[n for n in zfile.namelist() 
+                                          if not n.lower().endswith(NLCD_SKIP_EXTS)])
+        # End Credit
+        
+        if os.path.exists("NC_NLCD2019only.zip"):
+            print("NC_NLCD2019only.zip...")
+            os.remove("NC_NLCD2019only.zip")
+    return raster_path
 
 def getLandCoverData(data_path:str, 
                      wspace:str, 
@@ -34,6 +149,7 @@ def getLandCoverData(data_path:str,
     Output
     New feature layer name
     """
+    import arcpy
     # Checks to confirm valid file paths
     if not os.path.exists(data_path):
         raise FileNotFoundError(f"Data path '{data_path}' not found.")
@@ -45,55 +161,29 @@ def getLandCoverData(data_path:str,
     # Set workspace
     arcpy.env.workspace = wspace
 
-    # Get Raster Data
-    # https://www.lib.ncsu.edu/gis/nlcd
-    raster_path = os.path.join(data_path, "NC_Land_Cover/")
-    if not os.path.isdir(raster_path):
-        # 2019 only 
-        zipurl = 'https://gisdata.lib.ncsu.edu/fedgov/mrlc/nlcd2019/NC_NLCD2019only.zip'
-        print(f"Downloading land cover data from {zipurl}...")
-        arcpy.AddMessage(f"Downloading land cover data from {zipurl}...")
-        # 2001 - 2019, every 3 years (NOT IN USE)
-        # "https://drive.google.com/uc?id=1555Ox4664hH0kFlakGQwi1nzxrMcC61o&confirm=t&uuid=0edbf032-c3ba-45fe-b111-c3752b7cf8ae&at=ALgDtsw-mvJqXBLq4JMNZJ-5g2b7:1676943369421"
-        
-        # Credit to this method of unzipping a zip file goes to Shyamal Vaderia
-        # (see blog post at https://svaderia.github.io/articles/downloading-and-unzipping-a-zipfile/)
-        with urlopen(zipurl) as zipresp:
-            with ZipFile(BytesIO(zipresp.read())) as zfile:
-                zfile.extractall(raster_path)
-        # End Credit
-        
-        if "NC_NLCD2019only.zip" in os.listdir():
-            print("NC_NLCD2019only.zip...")
-            arcpy.AddMessage("NC_NLCD2019only.zip...")
-            os.remove("NC_NLCD2019only.zip")
+    # Get Raster Data (download if needed)
+    raster_path = downloadLandCoverData(data_path)
 
-    if fc_name not in arcpy.ListRasters():
+    if not arcpy.Exists(fc_name):
         print("Resampling explanatory rasters to 2k...")
         arcpy.AddMessage("Resampling explanatory rasters to 2k...")
-        # Resample cell size of raster(s), save to gdb
-        arcpy.management.Resample(os.path.join(raster_path, "nc_nlcd2019"), 
-                                f"{fc_name}_Resample_2k", 
-                                "2000 2000", 
-                                "NEAREST")
+        # Resample cell size of raster(s) into the memory workspace (intermediate only),
+        # using all cores
+        with arcpy.EnvManager(parallelProcessingFactor="100%"):
+            arcpy.management.Resample(os.path.join(raster_path, "nc_nlcd2019"), 
+                                      f"memory/{fc_name}_Resample_2k", 
+                                      "2000 2000", 
+                                      "NEAREST")
         
-        # Reproject the input raster if the spatial references do not match
-        arcpy.ProjectRaster_management(f"{fc_name}_Resample_2k", f"{fc_name}_projected", coord_sys)
-
-        # Get the mask polygon's extent
-        mask_polygon_extent = arcpy.Describe(nc_boundary).extent
-
-        # Set the output extent to match the mask polygon's extent
-        arcpy.env.extent = mask_polygon_extent
-
-        out_dem = arcpy.sa.ExtractByMask(f"{fc_name}_projected", nc_boundary)
-        out_dem.save(fc_name)
-
-        arcpy.env.extent = "MAXOF"
+        # Project and clip the resampled raster in one (all cores) pass, as for the DEM
+        with arcpy.EnvManager(outputCoordinateSystem=coord_sys,
+                              extent=arcpy.Describe(nc_boundary).extent,
+                              parallelProcessingFactor="100%"):
+            out_dem = arcpy.sa.ExtractByMask(f"memory/{fc_name}_Resample_2k", nc_boundary)
+            out_dem.save(fc_name)
 
         # Delete unneeded rasters
-        for ras in [f"{fc_name}_projected", f"{fc_name}_Resample_2k"]:
-            arcpy.Delete_management(ras)
+        arcpy.Delete_management(f"memory/{fc_name}_Resample_2k")
 
     print("Completed processing of explanatory rasters")
     arcpy.AddMessage("Completed processing of explanatory rasters")
@@ -10,10 +10,16 @@
 # to download the shapefile. It also uses os and zipfile for file handling.
 
 # Import libraries
+from __future__ import annotations
 import urllib.request
 import os
-import arcpy 
+import shutil
 import zipfile
+from tempfile import SpooledTemporaryFile
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    # arcpy is slow to import; it is imported inside the functions that use it
+    import arcpy
 
 def getNCBoundary(data_path:str, 
                   wspace:str, 
@@ -31,6 +37,7 @@ def getNCBoundary(data_path:str,
     Output
     The name of the output feature class.
     """
+    import arcpy
     # Checks to confirm valid file paths
     if not os.path.exists(data_path):
         raise FileNotFoundError(f"Data path '{data_path}' not found.")
@@ -48,20 +55,22 @@ def getNCBoundary(data_path:str,
         nc_shp_url = "https://www2.census.gov/geo/tiger/TIGER2018/COUSUB/tl_2018_37_cousub.zip"
         arcpy.AddMessage(f"Downloading NC State Boundary shapefile from {nc_shp_url}...")
         print(f"Downloading NC State Boundary shapefile from {nc_shp_url}...")
-        nc_out = os.path.join(nc_shp_path, "nc_state_boundary.zip")
-        urllib.request.urlretrieve(nc_shp_url, nc_out)
-        with zipfile.ZipFile(nc_out, "r") as zfile:
-            zfile.extractall(nc_shp_path)
-        os.remove(nc_out)
+        # Stream the zip in 1 MB chunks (spilling to a temporary file if large)
+        with urllib.request.urlopen(nc_shp_url) as resp, \
+                SpooledTemporaryFile(max_size=64 << 20) as spool:
+            shutil.copyfileobj(resp, spool, 1 << 20)
+            spool.seek(0)
+            with zipfile.ZipFile(spool, "r") as zfile:
+                zfile.extractall(nc_shp_path)
 
     # Add to GDB if needed
-    if fc_name not in arcpy.ListFeatureClasses():
+    if not arcpy.Exists(fc_name):
         arcpy.AddMessage("NC State Boundary download completed. Adding to geodatabase...")
         print("NC State Boundary download completed. Adding to geodatabase...")
-        arcpy.management.Dissolve(nc_shp_file , f"{fc_name}_dissolved", None, None, 
-                                  "SINGLE_PART", "DISSOLVE_LINES")
-        arcpy.Project_management(f"{fc_name}_dissolved", f"{fc_name}", coord_sys)
-        arcpy.Delete_management(f"{fc_name}_dissolved")
+        # Dissolve and project in one step (output is projected on write)
+        with arcpy.EnvManager(outputCoordinateSystem=coord_sys):
+            arcpy.management.Dissolve(nc_shp_file, fc_name, None, None, 
+                                      "SINGLE_PART", "DISSOLVE_LINES")
         arcpy.AddMessage(f"Finished adding boundary to geodatabase.")
         print("Finished adding boundary to geodatabase.")
 
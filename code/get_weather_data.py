@@ -41,11 +41,17 @@
 
 
 # Import libraries
+from __future__ import annotations
 import urllib.request
 import os
-import arcpy 
+import shutil
 import zipfile
-from typing import List
+from tempfile import SpooledTemporaryFile
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from typing import TYPE_CHECKING, List
+if TYPE_CHECKING:
+    import arcpy
 
 def getRastersFromDir(var:str, 
                       periods:list, 
@@ -59,14 +65,103 @@ def getRastersFromDir(var:str,
     Output
     A list of arcpy.Raster objects corresponding to the specified variable and periods.
     """
-    return [
-        arcpy.Raster(
-            os.path.join(
-                os.path.join(out_path, f"{var}_{p}"), 
-                [f for f in os.listdir(os.path.join(out_path, f"{var}_{p}") ) \
-                 if f.endswith('.bil') and var in f][0]
-            )
-        ) for p in periods] 
+    import arcpy
+    rasters = list()
+    for p in periods:
+        raster_dir = os.path.join(out_path, f"{var}_{p}")
+        # First matching .bil file (stops scanning the directory once found)
+        with os.scandir(raster_dir) as entries:
+            bil = next(e.name for e in entries if e.name.endswith('.bil') and var in e.name)
+        rasters.append(arcpy.Raster(os.path.join(raster_dir, bil)))
+    return rasters
+
+def projectRasterIfNeeded(in_raster:str, 
+                          out_raster:str, 
+                          coord_sys:arcpy.SpatialReference) -> str:
+    """
+    Projects a raster to the given coordinate system, unless it is already in that
+    coordinate system (in which case no copy of the raster is written).
+    Args
+    in_raster : The input raster name.
+    out_raster : The name of the projected output raster.
+    coord_sys : The projected coordinate system.
+    Output
+    The name of the raster in coord_sys (in_raster if no projection was needed)
+    """
+    import arcpy
+    src_sr = arcpy.Describe(in_raster).spatialReference
+    if src_sr.factoryCode == coord_sys.factoryCode and src_sr.name == coord_sys.name:
+        return in_raster
+    arcpy.ProjectRaster_management(in_raster, out_raster, coord_sys)
+    return out_raster
+
+# Weather variables/periods to download and aggregate
+WEATHER_VARS = ["ppt", "tmax", "tmin"]
+WEATHER_YEARS = [2017, 2018, 2019]
+WEATHER_MONTHS = ["{:02d}".format(m) for m in range(1, 13)]
+
+# Buffer (in meters) around the NC boundary extent used when processing the CONUS 
+# weather rasters (~5 4km cells), so the bilinear resample has data past the state border
+WEATHER_EXTENT_BUFFER = 20000
+
+# PRISM zip members needed to read the .bil rasters (metadata/station files are skipped)
+PRISM_RASTER_EXTS = ('.bil', '.hdr', '.prj', '.stx', '.bil.aux.xml')
+# Concurrent PRISM downloads (kept small; PRISM is a public web service)
+PRISM_MAX_WORKERS = 4
+
+def downloadPRISMZip(url:str, name:str, out_path:str) -> None:
+    """
+    Downloads a single PRISM zip file and extracts it to a directory of the same name. The
+    zip is streamed through a spooled buffer rather than saved to data/weather first.
+    Args
+    - url : The PRISM web service URL
+    - name : The name of the output directory (e.g. 'ppt_2017' or 'ppt_01')
+    - out_path : The path to the weather data directory
+    """
+    dwnld_path = os.path.join(out_path, name)
+    print(f"Downloading weather data from {url}...")
+    with urllib.request.urlopen(url) as resp, SpooledTemporaryFile(max_size=64 << 20) as spool:
+        shutil.copyfileobj(resp, spool, 1 << 20)
+        spool.seek(0)
+        with zipfile.ZipFile(spool, "r") as zfile:
+            zfile.extractall(dwnld_path, 
+                             members=[n for n in zfile.namelist() if n.endswith(PRISM_RASTER_EXTS)])
+    print(f"Extracted {name} to {dwnld_path}")
+
+def downloadWeatherData(data_path:str) -> str:
+    """
+    Downloads and extracts the PRISM weather rasters (yearly 4km 2017-19, monthly 30 year 
+    norms 800m) for each variable in WEATHER_VARS, skipping any that were previously
+    extracted. No geoprocessing is done here, so it can run in a worker thread alongside 
+    other downloads (progress is printed, not sent as arcpy messages).
+    Args
+    - data_path : A file path to the data directory
+    Output
+    The path to the directory containing the extracted weather data
+    """
+    pairs = list(product(WEATHER_VARS, WEATHER_YEARS))
+    norm_pairs = list(product(WEATHER_VARS, WEATHER_MONTHS))
+
+    # Data documentation https://www.prism.oregonstate.edu/documents/PRISM_downloads_web_service.pdf
+    out_path = os.path.join(data_path, "weather/")
+    os.makedirs(out_path, exist_ok=True)
+
+    # Download tasks: 4km yearly data (for 2017-2019), and 800m monthly data (30 year 
+    # normals), used to estimate higher resolution for the 4km data
+    tasks = [(f"https://services.nacse.org/prism/data/public/4km/{v}/{y}", f"{v}_{y}") 
+             for v, y in pairs] + \
+            [(f"https://services.nacse.org/prism/data/public/normals/800m/{v}/{m}", f"{v}_{m}") 
+             for v, m in norm_pairs]
+    tasks = [(url, name) for url, name in tasks 
+             if not os.path.exists(os.path.join(out_path, name))]
+
+    # Downloads are network-bound, so they are run concurrently
+    with ThreadPoolExecutor(max_workers=PRISM_MAX_WORKERS) as executor:
+        downloads = [executor.submit(downloadPRISMZip, url, name, out_path) 
+                     for url, name in tasks]
+        for download in downloads:
+            download.result()
+    return out_path
 
 def getWeatherData(data_path:str, 
                    wspace:str,
@@ -90,6 +185,7 @@ def getWeatherData(data_path:str,
     Output
     A list of aggregated raster layer names (should match the last three inputs)
     """
+    import arcpy
     # Checks to confirm valid file paths
     if not os.path.exists(data_path):
         raise FileNotFoundError(f"Data path '{data_path}' not found.")
@@ -100,137 +196,116 @@ def getWeatherData(data_path:str,
     # Set workspace
     arcpy.env.workspace = wspace
 
-    vars = ["ppt", "tmax", "tmin"]
+    vars = WEATHER_VARS
     # Setup for yearly 4km resolution 
-    yrs = [2017, 2018, 2019]
-    pairs = list()
-    pairs = [(v, y) for v in vars for y in yrs if (v, y) not in pairs]
+    yrs = WEATHER_YEARS
     # Setup for 30 year normal monthly 800m resolution
-
-    mnths = ["{:02d}".format(m) for m in range(1, 13)]
-    norm_pairs = list()
-    norm_pairs = [(v, m) for v in vars for m in mnths if (v, m) not in norm_pairs]
+    mnths = WEATHER_MONTHS
 
     ### Get Raster Data ######
     arcpy.AddMessage("Getting explanatory Weather Rasters...")
     print("Getting explanatory Weather Rasters...")
-    # Data documentation https://www.prism.oregonstate.edu/documents/PRISM_downloads_web_service.pdf
-    out_path = os.path.join(data_path, "weather/")
-    os.makedirs(out_path, exist_ok=True)
-
-    # 4km yearly data (for 2017-2019)
-    for v, y in pairs:
-        dwnld_out = os.path.join(out_path, f"{v}_{y}.zip")
-        dwnld_path = os.path.join(out_path, f"{v}_{y}")
-        if not os.path.exists(dwnld_path):
-            url = f"https://services.nacse.org/prism/data/public/4km/{v}/{y}" 
-            arcpy.AddMessage(f"Downloading weather data from {url}...")
-            print(f"Downloading weather data from {url}...")
-            urllib.request.urlretrieve(url, dwnld_out)
-            arcpy.AddMessage(f"Saved {v}/{y} to {dwnld_out}")
-            print(f"Saved {v}/{y} to {dwnld_out}")
-            with zipfile.ZipFile(dwnld_out, "r") as zfile:
-                zfile.extractall(dwnld_path)
-            arcpy.AddMessage(f"Extracted {v}/{y} from {dwnld_out} to {dwnld_path}")
-            print(f"Extracted {v}/{y} from {dwnld_out} to {dwnld_path}")
-            os.remove(dwnld_out)
-    
-    # 800m monthly data (30 year normals), used to estimate higher resolution for the 4km data
-    for v, m in norm_pairs:
-        dwnld_out = os.path.join(out_path, f"{v}_{m}.zip")
-        dwnld_path = os.path.join(out_path, f"{v}_{m}")
-        if not os.path.exists(dwnld_path):
-            url = f"https://services.nacse.org/prism/data/public/normals/800m/{v}/{m}" 
-            arcpy.AddMessage(f"Downloading weather data from {url}...")
-            print(f"Downloading weather data from {url}...")
-            urllib.request.urlretrieve(url, dwnld_out)
-            arcpy.AddMessage(f"Saved {v}/{m} to {dwnld_out}")
-            print(f"Saved {v}/{m} to {dwnld_out}")
-            with zipfile.ZipFile(dwnld_out, "r") as zfile:
-                zfile.extractall(dwnld_path)
-            arcpy.AddMessage(f"Extracted {v}/{m} from {dwnld_out} to {dwnld_path}")
-            print(f"Extracted {v}/{m} from {dwnld_out} to {dwnld_path}")
-            os.remove(dwnld_out)
+    out_path = downloadWeatherData(data_path)
 
     ### Process data and add to GDB #########
+    # Rasters already in the GDB (listed once, rather than once per variable)
+    existing_rasters = set(arcpy.ListRasters() or [])
+    # Processing extent: only the (buffered) NC area of the CONUS rasters is aggregated,
+    # projected and resampled, rather than the full grids
+    bnd_extent = arcpy.Describe(nc_boundary).extent
+    # Buffer converted to the units of the boundary's coordinate system (e.g. US feet)
+    if bnd_extent.spatialReference.type == "Projected":
+        buffer = WEATHER_EXTENT_BUFFER / bnd_extent.spatialReference.metersPerUnit
+    else:
+        # (approximate degrees, for a geographic coordinate system)
+        buffer = WEATHER_EXTENT_BUFFER / 111320
+    processing_extent = arcpy.Extent(bnd_extent.XMin - buffer, 
+                                     bnd_extent.YMin - buffer,
+                                     bnd_extent.XMax + buffer, 
+                                     bnd_extent.YMax + buffer,
+                                     spatial_reference=bnd_extent.spatialReference)
+    # Output raster name and aggregation function for each variable
+    var_config = {"tmax": (max_temp_data, "MAXIMUM"),
+                  "tmin": (min_temp_data, "MINIMUM"),
+                  "ppt": (avg_prec_data, "MEAN")}
     for var in vars:
-        if var == "tmax":
-            raster = max_temp_data
-        elif var == "tmin":
-            raster = min_temp_data
-        else:
-            raster = avg_prec_data
-        if raster not in arcpy.ListRasters():
-            arcpy.env.overwriteOutput = True
-            # Average with other years of same var type
-            agg_rasters = dict()
-            # Yearly data
-            rasters = getRastersFromDir(var, yrs, out_path)
-            raster_out = raster + "_US"
-            if var == "tmax":
-                agg_func = "MAXIMUM"
-            elif var == "tmin":
-                agg_func = "MINIMUM"
-            elif var == "ppt":
-                agg_func = "MEAN"
-            agg_rasters.update({var:{"yr":raster_out}})
-            arcpy.AddMessage(f"Aggregating {var} for all years...")
-            print(f"Aggregating {var} for all years...")
-            outCellStats = arcpy.sa.CellStatistics(rasters, agg_func, "DATA")
-            outCellStats.save(raster_out)
-            arcpy.AddMessage(f"Finished aggregating {var} for all years.")
-            print(f"Finished aggregating {var} for all years.")
-            # Monthly 30-year normals
-
-            rasters = getRastersFromDir(var, mnths, out_path) 
-            raster_out = f"{var}_30yr_800m"
-            agg_rasters[var].update({"norm":raster_out})
-            arcpy.AddMessage(f"Aggregating {var} for all 800m 30 year normal months...")
-            print(f"Aggregating {var} for all 800m 30 year normal months...")
-            outCellStats = arcpy.sa.CellStatistics(rasters, agg_func, "DATA")
-            outCellStats.save(raster_out)
-            arcpy.AddMessage(f"Finished aggregating {var} for all 30 year normal months.")
-            print(f"Finished aggregating {var} for all 30 year normal months.")
-
-            # Project to coord_sys
-            input_4km_proj = f"{agg_rasters[var]['yr']}_projected"
-            input_800m_proj = f"{agg_rasters[var]['norm']}_projected"
-            arcpy.ProjectRaster_management(agg_rasters[var]["yr"], input_4km_proj, coord_system)
-            arcpy.ProjectRaster_management(agg_rasters[var]["norm"], input_800m_proj, coord_system)
-
-            arcpy.Resample_management(
-                in_raster=input_4km_proj,
-                out_raster=f"resampled_{var}_800m",
-                cell_size=f"{800*3.28084} {800*3.28084}", #meters to feet
-                resampling_type="BILINEAR"  # You can choose other resampling methods if you prefer
-            )
-            # Calculate the weights based on the number of years in the datasets
-            initial_weight_4km = 3.0
-            initial_weight_800m = 3.0 / 30.0
-            total_weight = initial_weight_4km + initial_weight_800m
-            normalized_weight_4km = initial_weight_4km / total_weight
-            normalized_weight_800m = initial_weight_800m / total_weight
-
-            # Combine the rasters using the weighted average
-            combined_raster = (arcpy.Raster(f"resampled_{var}_800m") * normalized_weight_4km) + \
-                (arcpy.Raster(input_800m_proj) * normalized_weight_800m)
-
-            arcpy.AddMessage(f"Saving final {var} raster to geodatabase...")
-            print(f"Saving final {var} raster to geodatabase...")
-            out_raster = arcpy.sa.ExtractByMask(combined_raster, nc_boundary)
-            out_raster.save(raster)
-            arcpy.AddMessage(f"Saved {var} raster successfully!")
-            print(f"Saved {var} raster successfully!")
-
-            # Delete unneeded rasters
-            for k in agg_rasters.keys():
-                for k2 in agg_rasters[k].keys():
-                    if agg_rasters[k][k2] in arcpy.ListRasters():
-                        arcpy.Delete_management(agg_rasters[k][k2])
-            for r in [f"resampled_{var}_800m", input_4km_proj, input_800m_proj]:
-                if r in arcpy.ListRasters():
-                    arcpy.Delete_management(r)
-
-            arcpy.env.overwriteOutput = False
+        raster, agg_func = var_config[var]
+        if raster not in existing_rasters:
+            # Run each variable's geoprocessing with all cores (arcpy tools parallelize
+            # internally; they are not safe to call from multiple Python threads). Outputs
+            # are projected to coord_system on write, so no separate projection is needed
+            with arcpy.EnvManager(parallelProcessingFactor="100%", 
+                                  overwriteOutput=True,
+                                  outputCoordinateSystem=coord_system,
+                                  extent=processing_extent):
+                # Intermediate rasters are written to the memory workspace, so only the
+                # final (NC trimmed) raster is written to the GDB
+                # Average with other years of same var type
+                agg_rasters = dict()
+                # Yearly data
+                rasters = getRastersFromDir(var, yrs, out_path)
+                raster_out = f"memory/{raster}_US"
+                agg_rasters.update({var:{"yr":raster_out}})
+                arcpy.AddMessage(f"Aggregating {var} for all years...")
+                print(f"Aggregating {var} for all years...")
+                outCellStats = arcpy.sa.CellStatistics(rasters, agg_func, "DATA")
+                outCellStats.save(raster_out)
+                arcpy.AddMessage(f"Finished aggregating {var} for all years.")
+                print(f"Finished aggregating {var} for all years.")
+                # Monthly 30-year normals
+
+                rasters = getRastersFromDir(var, mnths, out_path) 
+                raster_out = f"memory/{var}_30yr_800m"
+                agg_rasters[var].update({"norm":raster_out})
+                arcpy.AddMessage(f"Aggregating {var} for all 800m 30 year normal months...")
+                print(f"Aggregating {var} for all 800m 30 year normal months...")
+                outCellStats = arcpy.sa.CellStatistics(rasters, agg_func, "DATA")
+                outCellStats.save(raster_out)
+                arcpy.AddMessage(f"Finished aggregating {var} for all 30 year normal months.")
+                print(f"Finished aggregating {var} for all 30 year normal months.")
+
+                # Project to coord_sys (skipped if already in coord_sys, i.e. when the
+                # aggregates were projected on write)
+                input_4km_proj = projectRasterIfNeeded(agg_rasters[var]["yr"], 
+                                                       f"{agg_rasters[var]['yr']}_projected", 
+                                                       coord_system)
+                input_800m_proj = projectRasterIfNeeded(agg_rasters[var]["norm"], 
+                                                        f"{agg_rasters[var]['norm']}_projected", 
+                                                        coord_system)
+
+                arcpy.Resample_management(
+                    in_raster=input_4km_proj,
+                    out_raster=f"memory/resampled_{var}_800m",
+                    cell_size=f"{800*3.28084} {800*3.28084}", #meters to feet
+                    resampling_type="BILINEAR"  # You can choose other resampling methods if you prefer
+                )
+                # Calculate the weights based on the number of years in the datasets
+                initial_weight_4km = 3.0
+                initial_weight_800m = 3.0 / 30.0
+                total_weight = initial_weight_4km + initial_weight_800m
+                normalized_weight_4km = initial_weight_4km / total_weight
+                normalized_weight_800m = initial_weight_800m / total_weight
+
+                # Combine the rasters using the weighted average
+                combined_raster = (arcpy.Raster(f"memory/resampled_{var}_800m") * normalized_weight_4km) + \
+                    (arcpy.Raster(input_800m_proj) * normalized_weight_800m)
+
+                arcpy.AddMessage(f"Saving final {var} raster to geodatabase...")
+                print(f"Saving final {var} raster to geodatabase...")
+                out_raster = arcpy.sa.ExtractByMask(combined_raster, nc_boundary)
+                out_raster.save(raster)
+                existing_rasters.add(raster)
+                arcpy.AddMessage(f"Saved {var} raster successfully!")
+                print(f"Saved {var} raster successfully!")
+
+                # Delete unneeded (in memory) rasters in a single call
+                to_delete = [r for r in dict.fromkeys([agg_rasters[var]["yr"], 
+                                                       agg_rasters[var]["norm"], 
+                                                       f"memory/resampled_{var}_800m", 
+                                                       input_4km_proj, 
+                                                       input_800m_proj]) 
+                             if arcpy.Exists(r)]
+                if to_delete:
+                    arcpy.management.Delete(";".join(to_delete))
 
     return [avg_prec_data, min_temp_data, max_temp_data]
\ No newline at end of file
@@ -18,14 +18,20 @@
 
 
 # Import libraries/modules
+from __future__ import annotations
 import itertools
-import arcpy 
-import pandas as pd
-from birds import Bird
+from birds import Species, Bird
 import pickle
 from math import inf
 import os
 import json
+import random
+from typing import TYPE_CHECKING, Iterator, Union
+if TYPE_CHECKING:
+    # arcpy/numpy/pandas are imported inside the functions that use them, so the 
+    # logging/grid helpers can be imported without them
+    import arcpy
+    import pandas as pd
 
 def getPrecision(TP:float, FP:float) -> float:
     """
@@ -57,31 +63,46 @@ def getF1(TP:float, FP:float, recall:float) -> float:
     except ZeroDivisionError:
         return -inf
 
-def scoreFromSensitivityTable(sensitivity_table: str) -> float:
+def scoreFromSensitivityTable(sensitivity_table: str, as_frame:bool=True) -> Union[pd.DataFrame, dict]:
     """
     Computes the F1 score of a model from the output values within the sensitivity table
     Args
     - sensitivity_table : name of sensitivity table in the GDB
+    - as_frame : whether to return a pandas DataFrame; if False, a dictionary of column 
+                 arrays (same columns) is returned, skipping the DataFrame construction
+    Output
+    Score table (cutoff, FP, TP, FN, TN, recall, specificity, precision, f1)
     """
+    import arcpy
+    import numpy as np
+    import pandas as pd
     # field_names = [field.name for field in arcpy.ListFields(sensitivity_table)]
-    with arcpy.da.SearchCursor(sensitivity_table, 
-                            ['CUTOFF', 'FPR', 'TPR', 'FNR', 'TNR', 'SENSE', 'SPEC']) as cursor:
-        vals = [
-            {
-                "cutoff": cutoff,
-                "FP": FP,
-                "TP": TP,
-                "FN": FN,
-                "TN": TN,
-                "recall": recall,
-                "specificity": specificity,
-                "precision": getPrecision(TP, FP),
-                "f1": getF1(TP, FP, recall),
-            }
-            for (cutoff, FP, TP, FN, TN, recall, specificity) in cursor
-        ]
-    df = pd.DataFrame.from_dict(vals)
-    return(df)
+    # Read the whole table as column arrays, then compute precision/F1 vectorized (same
+    # results as `getPrecision`/`getF1`, with -inf where they would divide by zero)
+    tbl = arcpy.da.TableToNumPyArray(sensitivity_table, 
+                                     ['CUTOFF', 'FPR', 'TPR', 'FNR', 'TNR', 'SENSE', 'SPEC'])
+    score = {
+        "cutoff": tbl['CUTOFF'],
+        "FP": tbl['FPR'],
+        "TP": tbl['TPR'],
+        "FN": tbl['FNR'],
+        "TN": tbl['TNR'],
+        "recall": tbl['SENSE'],
+        "specificity": tbl['SPEC']
+    }
+    TP = score["TP"].astype(float)
+    recall = score["recall"].astype(float)
+    pos = TP + score["FP"].astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(pos != 0, TP / pos, -inf)
+        f1 = np.where((pos != 0) & (precision + recall != 0), 
+                      2 * (precision * recall) / (precision + recall), 
+                      -inf)
+    score["precision"] = precision
+    score["f1"] = f1
+    if not as_frame:
+        return score
+    return(pd.DataFrame(score))
 
 # Log model parameters after they are trained
 def logModel(params:dict, log_file:str) -> None:
@@ -90,27 +111,14 @@ def logModel(params:dict, log_file:str) -> None:
     a log_file will correspond to each species of bird, and the logged parameters
     are those in the `parameter_grid` dictionary along with the best F1 score and 
     corresponding cutoff value. A new file will be created if it doesn't already
-    exist. Logs are dictionary values saved in a json file, each respectively 
-    appended to a list.
+    exist. Logs are dictionary values saved as newline-delimited json (one line 
+    per model), so each log is appended without re-reading the file.
     Args
     - params : The parameter dictionary
     - log_file : The path/file where the log should be dumped
     """
-    # If the file doesn't exist, create it with an empty list
-    if not os.path.isfile(log_file):
-        with open(log_file, "w") as f:
-            json.dump([], f)
-
-    # Read the existing content
-    with open(log_file, "r") as f:
-        content = json.load(f)
-
-    # Append the new parameters
-    content.append(params)
-
-    # Write the updated content back to the file
-    with open(log_file, "w") as f:
-        json.dump(content, f)
+    with open(log_file, "a") as f:
+        f.write(json.dumps(params) + "\n")
 
 def checkModelParams(file_dict:dict, params:dict) -> bool:
     """
@@ -131,6 +139,88 @@ def checkModelParams(file_dict:dict, params:dict) -> bool:
                 return True
     return False
 
+def loadModelLogs(log_path:str, species:str) -> list:
+    """
+    Reads all of the logged parameters for the given species into a single list, so that
+    they can be checked in memory for each parameter combination. Reads both newline-
+    delimited json logs (.jsonl) and older logs saved as a single json list (.json).
+    Args
+    - log_path : A file path to the directory containing model log files.
+    - species : The formatted name of the species.
+    Output
+    - List of logged parameter dictionaries for the species
+    """
+    logged = list()
+    for file in [f for f in os.listdir(log_path) if species in f]:
+        with open(os.path.join(log_path, file), 'r') as f:
+            if file.endswith(".jsonl"):
+                logged.extend(json.loads(line) for line in f if line.strip())
+            else:
+                logged.extend(json.load(f))
+    return logged
+
+def clearModelOutputs(species:str, wspace:str, data_path:str, model_data:bool=False) -> list:
+    """
+    Deletes the model outputs of a species in the GDB (trained features/raster, response
+    curve and sensitivity table), so that `batchMaxEnt()` refits it, e.g. after its input
+    points change. The saved champion model and training logs are kept (the champion is
+    refit on the new points, and logged combinations are not re-run) unless model_data 
+    is True, in which case the grid search starts over.
+    Args
+    - species : The formatted name of the species.
+    - wspace : A file path to the working directory/GDB
+    - data_path : A file path to the data directory
+    - model_data : whether or not to also delete the champion model pickle and the
+      training logs
+    Output
+    - List of the outputs that were deleted
+    """
+    import arcpy
+    removed = [f"{species}_NC_{out}" for out in ("Trained_Features", 
+                                                 "Trained_Raster", 
+                                                 "Response_Curve", 
+                                                 "Sensitivity_Table")]
+    removed = [out for out in removed if arcpy.Exists(os.path.join(wspace, out))]
+    if removed:
+        arcpy.management.Delete(";".join(os.path.join(wspace, out) for out in removed))
+    if not model_data:
+        return removed
+    model_data_path = os.path.join(data_path, "model_data")
+    log_path = os.path.join(model_data_path, "model_training_logs")
+    files = [os.path.join(model_data_path, f"{species}_model_data.pickle")]
+    if os.path.isdir(log_path):
+        files += [os.path.join(log_path, f) for f in os.listdir(log_path) 
+                  if f.startswith(f"{species}_model_log")]
+    for file in files:
+        if os.path.isfile(file):
+            os.remove(file)
+            removed.append(os.path.basename(file))
+    return removed
+
+def saveModelData(model_data:dict, out_filename:str) -> None:
+    """
+    Saves the champion model data for a species to a pickle file. The data is written to
+    a temporary file, then swapped in, so an interrupted run can't leave a partially 
+    written pickle.
+    Args
+    - model_data : dictionary of the champion model's data
+    - out_filename : The path/file of the pickle
+    """
+    with open(out_filename + ".tmp", "wb") as f:
+        pickle.dump(model_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(out_filename + ".tmp", out_filename)
+
+def modelSignature(params:dict) -> frozenset:
+    """
+    Hashable signature of a set of model parameters (ignoring f1 & cutoff), used to check
+    combinations against the logged parameters with a set lookup.
+    Args
+    - params : dictionary of model parameters (logged or to be run)
+    Output
+    - frozenset of the (parameter, value) pairs
+    """
+    return frozenset((k, v) for k, v in params.items() if k != "f1" and k != "cutoff")
+
 # Check if model already run previously
 def checkModelLogs(log_path:str, params:dict, species:str) -> bool:
     """
@@ -142,66 +232,37 @@ def checkModelLogs(log_path:str, params:dict, species:str) -> bool:
     Output
     - True if a model with the given parameters has already been run for the species, False otherwise.
     """
-    files = [f for f in os.listdir(log_path) if species in f]
-    for file in files:
-        file_path = os.path.join(log_path, file)
-        with open(file_path, 'r') as f:
-            file_dict = json.load(f)
-            if checkModelParams(file_dict, params):
-                return False
-    return True
+    return not checkModelParams(loadModelLogs(log_path, species), params)
 
 
-def getAllCombos(parameter_grid:dict) -> dict:
+def getAllCombos(parameter_grid:dict) -> Iterator[tuple]:
     """
-    Generate a list of all possible combinations of parameter values given a dictionary of
-    parameter names and their corresponding lists of values.
+    Generate all possible combinations of parameter values given a dictionary of
+    parameter names and their corresponding lists of values. Combinations are 
+    generated lazily (nothing is materialized until consumed).
     Args
     - parameter_grid : A dictionary where keys are parameter names and values 
                        are lists of possible parameter values.
     Output
-    A list of tuples, where each tuple represents a unique combination of parameter values.
+    An iterator of tuples, where each tuple represents a unique combination of parameter values.
     """
-    # Generate all combinations of parameters
-    if "NO_THINNING" not in parameter_grid["spatial_thinning"]:
-        all_combinations = list(itertools.product(*parameter_grid.values()))
-    elif "THINNING" not in parameter_grid["spatial_thinning"]:
-        # Generate combinations for NO_THINNING
-        all_combinations = [
-            (None, basis_expansion, weight, knots, "NO_THINNING", link_function, None)
-            for basis_expansion, weight, knots, link_function
+    # Thinning-specific parameters (number_of_iterations, thinning_distance_band) only 
+    # vary for THINNING; NO_THINNING combinations use None for both. NO_THINNING 
+    # combinations are generated first.
+    for thinning in [t for t in ("NO_THINNING", "THINNING") if t in parameter_grid["spatial_thinning"]]:
+        thin = thinning == "THINNING"
+        yield from (
+            (iterations, basis_expansion, weight, knots, thinning, link_function, distance_band)
+            for iterations, basis_expansion, weight, knots, link_function, distance_band
             in itertools.product(
+                parameter_grid["number_of_iterations"] if thin else [None],
                 parameter_grid["basis_expansion_functions"],
                 parameter_grid["relative_weight"],
                 parameter_grid["number_knots"],
-                parameter_grid["link_function"]
+                parameter_grid["link_function"],
+                parameter_grid["thinning_distance_band"] if thin else [None]
             )
-        ]
-    else:
-        # Generate combinations for NO_THINNING
-        no_thinning_combinations = [
-            (None, basis_expansion, weight, knots, "NO_THINNING", link_function, None)
-            for basis_expansion, weight, knots, link_function
-            in itertools.product(
-                parameter_grid["basis_expansion_functions"],
-                parameter_grid["relative_weight"],
-                parameter_grid["number_knots"],
-                parameter_grid["link_function"]
-            )
-        ]
-        # Generate combinations for THINNING
-        thinning_combinations = list(itertools.product(
-            parameter_grid["number_of_iterations"],
-            parameter_grid["basis_expansion_functions"],
-            parameter_grid["relative_weight"],
-            parameter_grid["number_knots"],
-            ["THINNING"],
-            parameter_grid["link_function"],
-            parameter_grid["thinning_distance_band"]
-        ))
-        # Combine the two lists of combinations
-        all_combinations = no_thinning_combinations + thinning_combinations
-    return all_combinations
+        )
 
 def runMaxEnt(static_params:dict, 
               params:dict, 
@@ -216,10 +277,10 @@ def runMaxEnt(static_params:dict,
     - outputs : A dictionary of output file names for the MaxEnt algorithm.
     - output : A flag indicating whether to save the model output to the workspace. Defaults to False.
     """
+    import arcpy
     if not output:
-        for k in outputs.keys():
-            if k != "output_sensitivity_table":
-                outputs[k] = None
+        # Only the sensitivity table is written (copy, so the caller's dict is unchanged)
+        outputs = {k: (v if k == "output_sensitivity_table" else None) for k, v in outputs.items()}
     result = arcpy.stats.PresenceOnlyPrediction(
         # Inputs
         input_point_features=static_params['input_point_features'],
@@ -258,7 +319,7 @@ def runMaxEnt(static_params:dict,
     return result
 
 
-def batchMaxEnt(species_df:pd.DataFrame, 
+def batchMaxEnt(species_df:Union[pd.DataFrame, Species], 
                 wspace:str, 
                 data_path:str,
                 explanatory_rasters:list,
@@ -272,14 +333,19 @@ def batchMaxEnt(species_df:pd.DataFrame,
                     "spatial_thinning": ["NO_THINNING"], # "THINNING"
                     "link_function": ["CLOGLOG"], # "LOGISTIC"
                     "thinning_distance_band": ["1000 Meters", "2500 Meters"] # "5000 Meters"
-                }) -> None:
+                },
+                n_trials:int = None,
+                seed:int = 0,
+                patience:int = None,
+                margin:float = 0.0) -> list:
     """
     Run the MaxEnt algorithm for presence-only species distribution modeling on a batch of species,
     given a dataframe of species information, a workspace path, and a data path. The function performs
     a grid search to find the optimal set of parameters for each species model and outputs the best
     model's results to the geodatabase.
     Args
-    - species_df : A pandas DataFrame containing species information.
+    - species_df : A pandas DataFrame containing species information (or a Species 
+                   object already built from it, which is reused as is).
     - wspace : A file path to the working directory/GDB
     - data_path : A file path to the data directory
     - explanatory_rasters : list of rasters saved in GDB to be used as input explanatory rasters;
@@ -289,7 +355,23 @@ def batchMaxEnt(species_df:pd.DataFrame,
                             (indicating categorical or continuous data).
     - nc_boundary : boundary of North Carolina, to be used as the STUDY_POLYGON
     - parameter_grid: dictionary of parameter values to iterate through (grid-search)
+    - n_trials : (Optional) number of combinations to randomly sample from the grid for 
+                 each species (random search), instead of trying all of them
+    - seed : random seed used to sample the `n_trials` combinations; the same seed gives the
+             same sample, so a resumed run continues with the same combinations
+    - patience : (Optional) stop the search for a species after this many consecutive
+                 combinations with an F1 score more than `margin` below the best one (a 
+                 new best, or a score within `margin` of it, resets the count). The stop
+                 is saved with the champion model, so a resumed run (with `patience` set)
+                 doesn't restart the search; delete the species' model data to do so
+    - margin : F1 score margin below the best score used by `patience`
+    Output
+    List of the trained rasters (re)created by this run (species modeled previously are
+    not included)
     """
+    import arcpy
+    import numpy as np
+    import pandas as pd
     # Checks to confirm valid file paths
     if not os.path.exists(data_path):
         raise FileNotFoundError(f"Data path '{data_path}' not found.")
@@ -300,168 +382,225 @@ def batchMaxEnt(species_df:pd.DataFrame,
     arcpy.AddMessage("Starting batch presence-only predictions...")
     # Set workspace
     arcpy.env.workspace = wspace
-    # Temporarily enable overwriting data
-    arcpy.env.overwriteOutput = True
-
-    # Create model output directory
-    model_data_path = os.path.join(data_path, "model_data")
-    if not os.path.exists(model_data_path):
-        os.makedirs(model_data_path)
-    log_path = os.path.join(model_data_path, "model_training_logs")
-    if not os.path.exists(log_path):
-        os.makedirs(log_path)
+    # Don't log every grid-search tool run to the geoprocessing history
+    prev_log_history = arcpy.GetLogHistory()
+    arcpy.SetLogHistory(False)
+    try:
+        # Temporarily enable overwriting data, and let each model run use all cores 
+        # (species/combinations are run one at a time); EnvManager restores both on exit,
+        # including on errors
+        with arcpy.EnvManager(overwriteOutput=True, parallelProcessingFactor="100%"):
+            # Create model output directory
+            model_data_path = os.path.join(data_path, "model_data")
+            if not os.path.exists(model_data_path):
+                os.makedirs(model_data_path)
+            log_path = os.path.join(model_data_path, "model_training_logs")
+            if not os.path.exists(log_path):
+                os.makedirs(log_path)
     
-    for species_name in species_df.species_name.unique():
-        brd = Bird(species_df, species_name)
-        s = brd.formatted_name
-        print(f"Modeling {brd.name} distribution in NC using the MaxEnt algorithm...")
-        arcpy.AddMessage(f"Modeling {brd.name} distribution in NC using the MaxEnt algorithm...")
+            # Feature classes already in the GDB (listed once, rather than once per species)
+            existing_fcs = set(arcpy.ListFeatureClasses() or [])
+            # Species lookup built once and shared by each Bird
+            species = species_df if isinstance(species_df, Species) else Species(species_df)
+            # Trained rasters output by this run
+            retrained = []
+            for species_name in species.names:
+                brd = Bird(species, species_name)
+                s = brd.formatted_name
+                print(f"Modeling {brd.name} distribution in NC using the MaxEnt algorithm...")
+                arcpy.AddMessage(f"Modeling {brd.name} distribution in NC using the MaxEnt algorithm...")
         
-        # Check if species already in gdb; If yes, just load model 
-        if f"{s}_NC_Trained_Features" in arcpy.ListFeatureClasses():
-            msg_str = f"Modeling already completed for {brd.name} for this project. " + \
-                      f"To re-compute, please delete the trained features for {brd.name} " + \
-                      "output by the model from the default geodatabase."
-            arcpy.AddMessage(msg_str)
-            print(msg_str)
-        else:
-            # Non-changing parameters (written out so that they can be saved)
-            static_params = {
-                "input_point_features":brd.fc_name,
-                "contains_background":"PRESENCE_ONLY_POINTS", 
-                "explanatory_variables":None,
-                "presence_indicator_field":None,
-                "distance_features":None, 
-                # T/F -> categorical/continuous
-                "explanatory_rasters":explanatory_rasters,
-                "study_area_type":"STUDY_POLYGON",
-                "study_area_polygon":nc_boundary, 
-                "presence_probability_cutoff":0.5, 
-                "features_to_predict":None, 
-                "explanatory_variable_matching":None, 
-                "explanatory_distance_matching":None, 
-                "explanatory_rasters_matching":None, 
-                "allow_predictions_outside_of_data_ranges":"ALLOWED", 
-                "resampling_scheme":"RANDOM", 
-                "number_of_groups":5
-            }
+                # Check if species already in gdb; If yes, just load model 
+                if f"{s}_NC_Trained_Features" in existing_fcs:
+                    msg_str = f"Modeling already completed for {brd.name} for this project. " + \
+                              f"To re-compute, please delete the trained features for {brd.name} " + \
+                              "output by the model from the default geodatabase."
+                    arcpy.AddMessage(msg_str)
+                    print(msg_str)
+                else:
+                    # Non-changing parameters (written out so that they can be saved)
+                    static_params = {
+                        "input_point_features":brd.fc_name,
+                        "contains_background":"PRESENCE_ONLY_POINTS", 
+                        "explanatory_variables":None,
+                        "presence_indicator_field":None,
+                        "distance_features":None, 
+                        # T/F -> categorical/continuous
+                        "explanatory_rasters":explanatory_rasters,
+                        "study_area_type":"STUDY_POLYGON",
+                        "study_area_polygon":nc_boundary, 
+                        "presence_probability_cutoff":0.5, 
+                        "features_to_predict":None, 
+                        "explanatory_variable_matching":None, 
+                        "explanatory_distance_matching":None, 
+                        "explanatory_rasters_matching":None, 
+                        "allow_predictions_outside_of_data_ranges":"ALLOWED", 
+                        "resampling_scheme":"RANDOM", 
+                        "number_of_groups":5
+                    }
             
-            # Get all combinations of parameters (# can vary depending on `spatial_thinning`)
-            all_combinations = getAllCombos(parameter_grid)
+                    # Get all combinations of parameters (# can vary depending on `spatial_thinning`)
+                    all_combinations = getAllCombos(parameter_grid)
             
-            # Initialize the best combination and its corresponding evaluation metric
-            files = os.listdir(model_data_path)
-            if f"{s}_model_data.pickle" in files:
-                # Read from previously saved model
-                try:
-                    with open(os.path.join(model_data_path, f"{s}_model_data.pickle"), "rb") as f:
-                        cached_model_data = pickle.load(f)
-                except IOError as e:
-                    print(f"Error reading the file: {e}")
-                best_combination = cached_model_data["combination"]
-                best_evaluation_metric = cached_model_data["f1"]
-            else:
-                # Initialize best combo/f1
-                best_combination = None
-                best_evaluation_metric = 0.0
+                    # Initialize the best combination and its corresponding evaluation metric
+                    if os.path.isfile(os.path.join(model_data_path, f"{s}_model_data.pickle")):
+                        # Read from previously saved model
+                        try:
+                            with open(os.path.join(model_data_path, f"{s}_model_data.pickle"), "rb") as f:
+                                cached_model_data = pickle.load(f)
+                        except IOError as e:
+                            print(f"Error reading the file: {e}")
+                        best_combination = cached_model_data["combination"]
+                        best_evaluation_metric = cached_model_data["f1"]
+                    else:
+                        # Initialize best combo/f1
+                        cached_model_data = None
+                        best_combination = None
+                        best_evaluation_metric = 0.0
             
-            # Iterate through possible parameter combinations (grid search)
-            for i, combination in enumerate(all_combinations, start=1):
+                    # Skip combinations run previously (logged for this species) before the grid
+                    # search starts, along with any duplicate combinations in the grid
+                    # (the parameter dict for each combination is built once, here)
+                    done = {modelSignature(p) for p in loadModelLogs(log_path, s)}
+                    all_combinations = [(c, dict(zip(parameter_grid.keys(), c))) 
+                                        for c in dict.fromkeys(all_combinations)]
+                    if n_trials is not None and n_trials < len(all_combinations):
+                        # Random search: sample (before removing logged runs, so that a resumed 
+                        # run picks up the rest of the same sample)
+                        all_combinations = random.Random(seed).sample(all_combinations, n_trials)
+                    all_combinations = [(c, params) for c, params in all_combinations 
+                                        if modelSignature(params) not in done]
+                    if patience is not None and cached_model_data is not None and \
+                       cached_model_data.get("stopped_early", False) and all_combinations:
+                        msg_str = f"Search for {brd.name} was previously stopped early; " + \
+                                  "skipping the remaining combinations."
+                        print(msg_str)
+                        arcpy.AddMessage(msg_str)
+                        all_combinations = []
+                    # Number of consecutive combinations scoring below the best F1 (- margin)
+                    n_stale = 0
 
-                params = dict(zip(parameter_grid.keys(), combination))
+                    # Iterate through remaining parameter combinations (grid search)
+                    for i, (combination, params) in enumerate(all_combinations, start=1):
 
-                # If model run previously, skip
-                if checkModelLogs(log_path, params, s):
-                    outputs = {
-                        "output_trained_features":f"{s}_NC_Trained_Features", 
-                        "output_trained_raster":f"{s}_NC_Trained_Raster",
-                        "output_response_curve_table":f"{s}_NC_Response_Curve", 
-                        "output_sensitivity_table":f"{s}_NC_Sensitivity_Table",
-                        "output_pred_features":None, 
-                        "output_pred_raster":None
-                    }
+                        outputs = {
+                            "output_trained_features":f"{s}_NC_Trained_Features", 
+                            "output_trained_raster":f"{s}_NC_Trained_Raster",
+                            "output_response_curve_table":f"{s}_NC_Response_Curve", 
+                            # Scratch table (memory workspace); only read for scoring
+                            "output_sensitivity_table":f"memory/{s}_NC_Sensitivity_Table",
+                            "output_pred_features":None, 
+                            "output_pred_raster":None
+                        }
 
-                    print(f"Training model for {brd.name} with combination [{i}/{len(all_combinations)}]:")
-                    arcpy.AddMessage(f"Training model for {brd.name} with combination [{i}/{len(all_combinations)}]:")
-                    for k, v in zip(params.keys(), params.values()):
-                        print(f"{k}: {v}")
-                        arcpy.AddMessage(f"{k}: {v}")
+                        # Single message per combination (rather than one per parameter)
+                        msg_str = f"Training model for {brd.name} with combination [{i}/{len(all_combinations)}]:\n" + \
+                                  "\n".join(f"{k}: {v}" for k, v in params.items())
+                        print(msg_str)
+                        arcpy.AddMessage(msg_str)
 
-                    # Run MaxEnt with the current set of parameters
-                    runMaxEnt(static_params, params, outputs, output = False)
+                        # Run MaxEnt with the current set of parameters
+                        runMaxEnt(static_params, params, outputs, output = False)
 
-                    # Calculate F1 score using the output_sensitivity_table
-                    score = scoreFromSensitivityTable(f"{s}_NC_Sensitivity_Table")
-                    # Remove sensitivity table from gdb (will save final table)
-                    arcpy.Delete_management(f"{s}_NC_Sensitivity_Table")
-                    
-                    # Report scoring
-                    f1 = max(score.f1)
-                    max_f1_index = score.f1.idxmax()
-                    cutoff = score.loc[max_f1_index, 'cutoff']
-                    msg_str = "===============================\n" + \
-                              f"{brd.name} Combination {i} results:\n" + \
-                              "-------------------------------\n" + \
-                              f"Max F1: {round(f1, 4)}\n" + \
-                              f"Best Cutoff: {round(cutoff, 2)}\n" + \
-                              "==============================="
-                    print(msg_str)
-                    arcpy.AddMessage(msg_str)
+                        # Calculate F1 score using the output_sensitivity_table
+                        # (column arrays; a DataFrame is only built if this model is the champion)
+                        score = scoreFromSensitivityTable(outputs["output_sensitivity_table"], as_frame=False)
+                        # Remove scratch sensitivity table (will save final table)
+                        arcpy.Delete_management(outputs["output_sensitivity_table"])
+                
+                        # Report scoring
+                        # (single argmax pass; first max wins, as with idxmax)
+                        max_f1_index = int(np.argmax(score["f1"]))
+                        f1 = score["f1"][max_f1_index]
+                        cutoff = score["cutoff"][max_f1_index]
+                        msg_str = "===============================\n" + \
+                                  f"{brd.name} Combination {i} results:\n" + \
+                                  "-------------------------------\n" + \
+                                  f"Max F1: {round(f1, 4)}\n" + \
+                                  f"Best Cutoff: {round(cutoff, 2)}\n" + \
+                                  "==============================="
+                        print(msg_str)
+                        arcpy.AddMessage(msg_str)
 
-                    # Write model logs
-                    params.update({"f1":f1, "cutoff":round(cutoff, 2)})
-                    log_file = os.path.join(log_path, f"{s}_model_log.json")
-                    logModel(params, log_file)
+                        # Write model logs
+                        params.update({"f1":f1, "cutoff":round(cutoff, 2)})
+                        log_file = os.path.join(log_path, f"{s}_model_log.jsonl")
+                        logModel(params, log_file)
 
-                    # Compare the current F1 score with the best one found so far
-                    if f1 > best_evaluation_metric:
-                        print(f"Updating results of combination {i} to champion model for {brd.name}...")
-                        arcpy.AddMessage(f"Updating results of combination {i} to champion model for {brd.name}...")
-                        best_evaluation_metric = f1
-                        best_combination = combination
-                        # Save model data to a pickle file
-                        model_data = {
-                            "input_point_features":brd.fc_name,
-                            "species":brd.name,
-                            "f1":f1,
-                            "cutoff":cutoff,
-                            "score_table":score,
-                            "combination":combination,
-                            "params":params,
-                            "other_input_values":static_params,
-                            "outputs":outputs
-                        }
-                        out_filename = os.path.join(model_data_path, f"{s}_model_data.pickle")
-                        with open(out_filename, "wb") as f:
-                            pickle.dump(model_data, f)
+                        # Compare the current F1 score with the best one found so far
+                        if f1 > best_evaluation_metric:
+                            print(f"Updating results of combination {i} to champion model for {brd.name}...")
+                            arcpy.AddMessage(f"Updating results of combination {i} to champion model for {brd.name}...")
+                            best_evaluation_metric = f1
+                            best_combination = combination
+                            # Save model data to a pickle file
+                            model_data = {
+                                "input_point_features":brd.fc_name,
+                                "species":brd.name,
+                                "f1":f1,
+                                "cutoff":cutoff,
+                                "score_table":pd.DataFrame(score),
+                                "combination":combination,
+                                "params":params,
+                                "other_input_values":static_params,
+                                "outputs":outputs
+                            }
+                            saveModelData(model_data, os.path.join(model_data_path, f"{s}_model_data.pickle"))
+                            # Keep the champion in memory (no need to re-read the pickle below)
+                            cached_model_data = model_data
+                            n_stale = 0
+                        elif f1 < best_evaluation_metric - margin:
+                            n_stale += 1
+                            # Early stopping
+                            if patience is not None and n_stale >= patience and i < len(all_combinations):
+                                msg_str = f"No improvement for {brd.name} (within {margin} F1) in {n_stale} " + \
+                                          "consecutive combinations; stopping search early."
+                                print(msg_str)
+                                arcpy.AddMessage(msg_str)
+                                # Record the stop with the champion, so it holds across resumes
+                                if cached_model_data is not None:
+                                    cached_model_data["stopped_early"] = True
+                                    saveModelData(cached_model_data, 
+                                                  os.path.join(model_data_path, f"{s}_model_data.pickle"))
+                                break
+                        else:
+                            # Within `margin` of the best score
+                            n_stale = 0
 
-            print(f"Best model for {brd.name}: {best_combination}, {best_evaluation_metric}")
-            arcpy.AddMessage(f"Best model for {brd.name}: {best_combination}, {best_evaluation_metric}")
+                    print(f"Best model for {brd.name}: {best_combination}, {best_evaluation_metric}")
+                    arcpy.AddMessage(f"Best model for {brd.name}: {best_combination}, {best_evaluation_metric}")
 
-            # Output model results to project
-            with open(os.path.join(model_data_path, f"{s}_model_data.pickle"), "rb") as f:
-                cached_model_data = pickle.load(f)
+                    # Output model results to project (champion model data is already in memory,
+                    # either loaded from the cache or saved during the grid search)
+                    if cached_model_data is None:
+                        with open(os.path.join(model_data_path, f"{s}_model_data.pickle"), "rb") as f:
+                            cached_model_data = pickle.load(f)
 
-            print(f"Outputting best model results for {s}, with trained raster cell size set to {arcpy.env.cellSize}")
-            arcpy.AddMessage(f"Outputting best model results for {s}, with trained raster cell size set to {arcpy.env.cellSize}")
-            # Update static cutoff to best model cutoff
-            cached_model_data["presence_probability_cutoff"] = round(cached_model_data["cutoff"], 2)
-            runMaxEnt(
-                    static_params=cached_model_data["other_input_values"], 
-                    params=cached_model_data["params"], 
-                    outputs= {
-                        "output_trained_features":f"{s}_NC_Trained_Features", 
-                        "output_trained_raster":f"{s}_NC_Trained_Raster",
-                        "output_response_curve_table":f"{s}_NC_Response_Curve", 
-                        "output_sensitivity_table":f"{s}_NC_Sensitivity_Table",
-                        "output_pred_features":None, 
-                        "output_pred_raster":None
-                    }, 
-                    output = True)
-            print(f"Saved best model for {brd.name} to geodatabase.")
-            arcpy.AddMessage(f"Saved best model for {brd.name} to geodatabase.")
+                    print(f"Outputting best model results for {s}, with trained raster cell size set to {arcpy.env.cellSize}")
+                    arcpy.AddMessage(f"Outputting best model results for {s}, with trained raster cell size set to {arcpy.env.cellSize}")
+                    # Update static cutoff to best model cutoff (the final run is the only one that
+                    # classifies the trained features with it, so it is not a repeat of the search)
+                    final_static_params = dict(cached_model_data["other_input_values"], 
+                                               presence_probability_cutoff=round(cached_model_data["cutoff"], 2))
+                    runMaxEnt(
+                            static_params=final_static_params, 
+                            params=cached_model_data["params"], 
+                            outputs= {
+                                "output_trained_features":f"{s}_NC_Trained_Features", 
+                                "output_trained_raster":f"{s}_NC_Trained_Raster",
+                                "output_response_curve_table":f"{s}_NC_Response_Curve", 
+                                "output_sensitivity_table":f"{s}_NC_Sensitivity_Table",
+                                "output_pred_features":None, 
+                                "output_pred_raster":None
+                            }, 
+                            output = True)
+                    retrained.append(f"{s}_NC_Trained_Raster")
+                    print(f"Saved best model for {brd.name} to geodatabase.")
+                    arcpy.AddMessage(f"Saved best model for {brd.name} to geodatabase.")
+    finally:
+        arcpy.SetLogHistory(prev_log_history)
 
     print("Finished presence-only prediction batch process")
     arcpy.AddMessage("Finished presence-only prediction batch process")
-    # Disable overwriting data
-    arcpy.env.overwriteOutput = False
\ No newline at end of file
+
+    return retrained
\ No newline at end of file
@@ -20,12 +20,18 @@
 
 
 # Import libraries/modules
-import arcpy
+from __future__ import annotations
 import os
 import pandas as pd
-from birds import Bird
+from birds import Species
 import locale
 import sys
+from typing import TYPE_CHECKING, Union
+if TYPE_CHECKING:
+    import arcpy
+
+# Basemap layers that stay visible on every species map
+BASEMAP_LAYERS = frozenset({"World Terrain Reference", "World Terrain Base", "World Hillshade"})
 
 def hexToRGB(hex_color:str) -> tuple:
     """
@@ -35,15 +41,20 @@ def hexToRGB(hex_color:str) -> tuple:
     Output
     Tuple with RGB Value
     """
-    hex_color = hex_color.lstrip('#')
-    return list(int(hex_color[i:i+2], 16) for i in (0, 2, 4)) + [100]
+    # Decode all three hex pairs in one call
+    return list(bytes.fromhex(hex_color.lstrip('#'))) + [100]
 
 def createMapAndExport(project_path:str, 
                        wspace:str, 
                        brd_rasters:dict, 
                        output_folder:str,
                        colors:list=['#F6FCE1', '#CFD6B4', '#F5CA7A', '#D98754'],
-                       tool_script:bool=False) -> None:
+                       tool_script:bool=False,
+                       verbose:bool=True,
+                       overwrite:bool=False,
+                       project:arcpy.mp.ArcGISProject=None,
+                       save:bool=True,
+                       refresh:list=None) -> None:
     """
     Creates and exports maps for the modeled distribution of each bird species.
     Args
@@ -53,106 +64,123 @@ def createMapAndExport(project_path:str,
     - output_folder : The output folder location for the PDFs.
     - colors : list of 4 hexidecimal color values
     - tool_script : whether or not it is running via the tool script
+    - verbose : whether or not to report progress for each species
+    - overwrite : whether or not to re-export maps whose PDF already exists
+    - project : (Optional) already opened project to reuse instead of opening 
+      project_path
+    - save : whether or not to save the project afterwards (if not running via the 
+      tool script)
+    - refresh : (Optional) trained rasters (re)created since their maps were last
+      exported; their PDFs are always re-exported
     """
+    import arcpy
     
-    # Set workspace
-    arcpy.env.workspace = wspace
-
     # Define project
-    if tool_script:
-        project = arcpy.mp.ArcGISProject('CURRENT')
-    else:
-        project = arcpy.mp.ArcGISProject(project_path)
-    arcpy.env.overwriteOutput = True
-    arcpy.env.resamplingMethod = "CUBIC"
-
-    # Loop through each trained raster
-    for raster in brd_rasters.keys():
-        # Get species name
-        species_name = brd_rasters[raster]
-        print(f"Adding {species_name} raster layer to map...")
-        arcpy.AddMessage(f"Adding {species_name} raster layer to map...")
-        # Create a new map and add it to the project
-        m = project.listMaps("Map")[0]
+    if project is None:
+        if tool_script:
+            project = arcpy.mp.ArcGISProject('CURRENT')
+        else:
+            project = arcpy.mp.ArcGISProject(project_path)
+
+    # RGB symbology colors (constant across species)
+    palette = [hexToRGB(c) for c in colors]
+    # Class break labels (upper bounds 0.25, 0.50, ...; constant across species)
+    labels = ["\u2264 " + str(locale.format_string("%.2f", 0.25 * (i + 1), grouping=True)) 
+              for i in range(len(colors))]
+
+    # The same map and (default) layout are reused for every species
+    m = project.listMaps("Map")[0]
+    layout = project.listLayouts("Layout")[0]
+    # Layout elements (title, map frame, legend) don't change between species; only 
+    # their text, extent and legend item are updated in the loop
+    title = layout.listElements("TEXT_ELEMENT")[0]
+    mf = layout.listElements("MAPFRAME_ELEMENT")[0]
+    legend = layout.listElements("LEGEND_ELEMENT", "Legend")[0]
+    legend.showTitle = True
+
+    # Hide all (non-basemap) layers once; afterwards only the species layers are toggled
+    for lyr in m.listLayers():
+        if lyr.name not in BASEMAP_LAYERS:
+            lyr.visible = False
+    prev_lyr = None
+    refresh = set(refresh or [])
+
+    # Scoped environment for the layer/export loop (restored afterwards)
+    with arcpy.EnvManager(workspace=wspace, overwriteOutput=True, resamplingMethod="CUBIC"):
+        # Loop through each trained raster
+        for raster in brd_rasters.keys():
+            # Get species name
+            species_name = brd_rasters[raster]
+            # Skip species already exported (e.g., when resuming an interrupted run), unless
+            # the model was retrained since
+            pdf_path = os.path.join(output_folder, raster.replace('Trained_Raster', 'Dist') + ".pdf")
+            if os.path.exists(pdf_path) and not overwrite and raster not in refresh:
+                if verbose:
+                    print(f"{species_name}: {pdf_path} already exists; skipping...")
+                    arcpy.AddMessage(f"{species_name}: {pdf_path} already exists; skipping...")
+                continue
         
-        # Check if raster + "_Lyr" already exists in the map and remove it
-        for lyr in m.listLayers():
-            if lyr.name == raster + "_Lyr":
+            # Check if raster + "_Lyr" already exists in the map and remove it
+            for lyr in m.listLayers(raster + "_Lyr"):
                 m.removeLayer(lyr)
-                break
-        
-        # Create a raster layer from the raster
-        raster_layer = arcpy.MakeRasterLayer_management(raster, raster + "_Lyr")
-        # Add layer to map
-        m.insertLayer(reference_layer=m.listLayers()[1], 
-                      insert_layer_or_layerfile=raster_layer[0],
-                      insert_position="AFTER")
         
-        # lyrs = [lyr.name for lyr in m.listLayers()]
-        for i, lyr in enumerate(m.listLayers()):
-            if lyr.name == raster + "_Lyr":
-                l = lyr
-                l_idx = i
-            elif lyr.name not in ["World Terrain Reference", "World Terrain Base", "World Hillshade"]:
-                lyr.visible = False
-
-        sym = l.symbology
-        sym.updateColorizer("RasterClassifyColorizer")
-        # sym.colorizer.classificationField = f"{species_name} Estimated Probability"
-        # sym.colorizer.breakCount = 5
-        upperBound = 0.25
-        for i, brk in enumerate(sym.colorizer.classBreaks):
-            # brk.upperBound = upperBound
-            brk.label = "\u2264 " + str(locale.format_string("%.2f", upperBound, grouping=True))
-            brk.color = {'RGB' : hexToRGB(colors[i])}
-            sym.colorizer.classBreaks[i] = brk
-            upperBound += 0.25
-
-        l.symbology = sym
-        l.visible = True
+            # Create a raster layer from the raster
+            raster_layer = arcpy.MakeRasterLayer_management(raster, raster + "_Lyr")
+            # Add layer to map
+            m.insertLayer(reference_layer=m.listLayers()[1], 
+                          insert_layer_or_layerfile=raster_layer[0],
+                          insert_position="AFTER")
         
-        print(f"Creating a layout for {species_name}...")
-        arcpy.AddMessage(f"Creating a layout for {species_name}...")
-        # Get the default layout
-        layout = project.listLayouts("Layout")[0]
-
-        # Update the title of the layout
-        title = [el for el in layout.listElements("TEXT_ELEMENT")][0]
-        print("Updating title in layout...")
-        arcpy.AddMessage("Updating title in layout...")
-        title.text = species_name + " Modeled Distribution"
+            # Map's copy of the inserted layer; hide the previous species' layer
+            l = m.listLayers(raster + "_Lyr")[0]
+            if prev_lyr is not None:
+                prev_lyr.visible = False
+            prev_lyr = l
+
+            sym = l.symbology
+            sym.updateColorizer("RasterClassifyColorizer")
+            # sym.colorizer.classificationField = f"{species_name} Estimated Probability"
+            # sym.colorizer.breakCount = 5
+            for i, brk in enumerate(sym.colorizer.classBreaks):
+                brk.label = labels[i]
+                brk.color = {'RGB' : palette[i]}
+                sym.colorizer.classBreaks[i] = brk
+
+            l.symbology = sym
+            l.visible = True
         
-        # Zoom to the extent of the raster layer
-        print("Zooming to map layer extent...")
-        arcpy.AddMessage("Zooming to map layer extent...")
-        mf = layout.listElements("MAPFRAME_ELEMENT")[0]
-        layer_extent = mf.getLayerExtent(l)
-        mf.panToExtent(layer_extent)
-
-        # Legend
-        print("Updating legend...")
-        arcpy.AddMessage("Updating legend...")
-        legend = layout.listElements("LEGEND_ELEMENT", "Legend")[0]
-        for lyr in legend.items:
-            if lyr.name != raster + "_Lyr":
-                legend.removeItem(lyr)
-        if not l.name in [lyr.name for lyr in legend.items]:
-            legend.addItem(l)
-        legend.showTitle = True
-        legend.title = f"{species_name} Estimated Probability"
-
-        # Export the layout to a PDF
-        pdf_path = os.path.join(output_folder, raster.replace('Trained_Raster', 'Dist') + ".pdf")
-        print(f"Exporting {species_name} layout to {pdf_path}...")
-        arcpy.AddMessage(f"Exporting {species_name} layout to {pdf_path}...")
-        layout.exportToPDF(pdf_path, 
-                           resolution=250, 
-                           image_quality="BEST", 
-                           image_compression="NONE")
+            # Update the title of the layout
+            title.text = species_name + " Modeled Distribution"
         
-    arcpy.env.overwriteOutput = False
+            # Zoom to the extent of the raster layer
+            layer_extent = mf.getLayerExtent(l)
+            mf.panToExtent(layer_extent)
+
+            # Legend
+            for lyr in legend.items:
+                if lyr.name != raster + "_Lyr":
+                    legend.removeItem(lyr)
+            if not any(lyr.name == l.name for lyr in legend.items):
+                legend.addItem(l)
+            legend.title = f"{species_name} Estimated Probability"
+
+            # Export the layout to a PDF
+            # One progress message per species (layer, layout, title, extent, legend, export)
+            if verbose:
+                print(f"{species_name}: exporting {pdf_path}...")
+                arcpy.AddMessage(f"{species_name}: exporting {pdf_path}...")
+            # Classified (4 class) rasters render nearly identically at a lower resample 
+            # ratio; adaptive compression and no feature attributes keep the export light
+            layout.exportToPDF(pdf_path, 
+                               resolution=150, 
+                               image_quality="NORMAL", 
+                               image_compression="ADAPTIVE",
+                               compress_vector_graphics=True,
+                               embed_fonts=True,
+                               layers_attributes="NONE")
+
     # Save the current state of the project
-    if not tool_script:
+    if save and not tool_script:
         try:
             project.save()
         except OSError as e:
@@ -161,22 +189,35 @@ def createMapAndExport(project_path:str,
             sys.exit()
 
 
-def outputMaxEntMaps(species_df:pd.DataFrame, 
+def outputMaxEntMaps(species_df:Union[pd.DataFrame, Species], 
                      project_path:str, 
                      wspace:str, 
                      data_path:str, 
                      output_folder:str=None,
-                     tool_script:bool=False) -> None:
+                     tool_script:bool=False,
+                     verbose:bool=True,
+                     overwrite:bool=False,
+                     project:arcpy.mp.ArcGISProject=None,
+                     save:bool=True,
+                     refresh:list=None) -> None:
     """
     Organizes and generates maps for each bird species.
     Args
-    - species_df : The DataFrame of bird species
+    - species_df : The DataFrame of bird species (or a Species object built from it)
     - project_path : The file path to the project file
     - wspace : The workspace location for the raster layers
     - data_path : The file path to the data folder
     - output_folder : The output folder location for the PDFs
     - tool_script : whether or not it is running from the tool script
+    - verbose : whether or not to report progress for each species
+    - overwrite : whether or not to re-export maps whose PDF already exists
+    - project : (Optional) already opened project to reuse instead of opening 
+      project_path
+    - save : whether or not to save the project afterwards
+    - refresh : (Optional) trained rasters (re)created since their maps were last 
+      exported (as returned by `batchMaxEnt()`); their PDFs are always re-exported
     """
+    import arcpy
 
     # Checks to confirm valid file paths
     if not os.path.exists(project_path):
@@ -194,21 +235,26 @@ def outputMaxEntMaps(species_df:pd.DataFrame,
         os.makedirs(output_folder)
 
     # Get trained rasters
-    trained_rasters = arcpy.ListRasters("*_NC_Trained_Raster")
+    trained_rasters = set(arcpy.ListRasters("*_NC_Trained_Raster") or [])
 
-    # Get bird/raster name key/value pairs
-    brd_rasters = [{Bird(species_df, name).formatted_name +\
-                   "_NC_Trained_Raster":Bird(species_df, name).formatted_name.replace("_", " ")}\
-                   for name in species_df.species_name.unique() \
-                   if Bird(species_df, name).formatted_name + "_NC_Trained_Raster" in trained_rasters]
-    brd_rasters = {key: value for d in brd_rasters for key, value in d.items()}
+    # Get bird/raster name key/value pairs (formatted names for all species at once)
+    species = species_df if isinstance(species_df, Species) else Species(species_df)
+    brd_rasters = dict()
+    for formatted_name in species.formattedNames().values():
+        if f"{formatted_name}_NC_Trained_Raster" in trained_rasters:
+            brd_rasters[f"{formatted_name}_NC_Trained_Raster"] = formatted_name.replace("_", " ")
 
     # Create map layers export map pdfs for each of the rasters
     createMapAndExport(project_path=project_path, 
                        wspace=wspace, 
                        brd_rasters=brd_rasters, 
                        output_folder=output_folder, 
-                       tool_script=tool_script)
+                       tool_script=tool_script,
+                       verbose=verbose,
+                       overwrite=overwrite,
+                       project=project,
+                       save=save,
+                       refresh=refresh)
 
 
 
@@ -10,40 +10,81 @@
 # classes in the geodatabase.
 
 # Import libraries/modules
+from __future__ import annotations
 import os
-import arcpy
+import hashlib
+from contextlib import ExitStack
 import pandas as pd
-from birds import Bird
+from birds import Species, Bird
+from presence_only import clearModelOutputs
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    import arcpy
+
+# Attribute fields (and geodatabase field types) of the bird point feature classes,
+# matching the columns of the cleaned FeederWatch data
+FW_FIELDS = {"species_code": "TEXT", 
+             "species_name": "TEXT", 
+             "how_many": "LONG", 
+             "latitude": "DOUBLE", 
+             "longitude": "DOUBLE", 
+             "subnational1_code": "TEXT", 
+             "date": "DATE"}
+
+def fileHash(path:str, chunk_size:int=1<<20) -> str:
+    """
+    SHA-256 hash of a file's contents (read in chunks)
+    Args
+    - path : path to the file
+    - chunk_size : number of bytes read at a time
+    Output
+    Hexadecimal digest string
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
 
 def batchBirdProcessing(fw_file:str, 
                         base_fc:str,
-                        existing_fcs:list,
+                        existing_fcs:set,
                         out_coordinate_system:arcpy.SpatialReference, 
                         data_path:str,
                         wspace:str,
                         fw_df:pd.DataFrame,
                         species_df:pd.DataFrame,
                         nc_boundary:str,
-                        _prefix:str = "FW_") -> None:
+                        _prefix:str = "FW_",
+                        clear_model_data:bool = False) -> None:
     """
     Batch processing of FeederWatch bird data. 
     Steps:
-    1) Creates Feature Class from .csv file in file Geodatabase
-    2) Adds projection, saving to new Feature Class
+    1) Creates a (WGS84) point Feature Class in memory from the FeederWatch data
+    2) Selects the points within the study area, saving them (projected) to a new 
+       Feature Class
     3) Filters Projected Feature Class by species, saving individual
        species to their own Feature Classes in the database
+    If the FeederWatch data file has changed since the Feature Classes were
+    created (tracked by a hash stamp file in the data path), they are rebuilt, and the 
+    models trained on them are cleared (see `clearModelOutputs()`). If there is no stamp 
+    yet, existing Feature Classes are kept and the stamp is written.
     Args: 
     - fw_file: FeederWatch data .csv file
     - base_fc: Base Feature Class name
-    - existing_fcs: List of existing Feature Classes already saved to the 
+    - existing_fcs: Set of existing Feature Classes already saved to the 
       database (if they already exist, they will be skipped during batch
-      processing)
+      processing); feature classes created here are added to it
     - out_coordinate_system: Projected coordinate system
     - data_path: Path to feederwatch data
     - fw_df: FeederWatch dataframe
     - species_df: Species dataframe
     - nc_boundary: North Carolina State boundary to be used as the study area
+    - _prefix: Prefix of the species Feature Class names
+    - clear_model_data: whether or not to also delete the champion models and training 
+      logs of species whose data changed, so their grid searches start over
     """
+    import arcpy
     # Checks to confirm valid file paths
     if not os.path.exists(data_path):
         raise FileNotFoundError(f"Data path '{data_path}' not found.")
@@ -57,37 +98,104 @@ def batchBirdProcessing(fw_file:str,
     arcpy.AddMessage("Starting batch processing of bird data prior to analysis...")
 
     arcpy.env.workspace = wspace
+    # Species table is built once and shared by each Bird
+    species = Species(species_df)
+
+    # A stamp file records the hash of the FeederWatch data the bird feature classes
+    # were built from; if the data has changed since, those feature classes are rebuilt,
+    # and the models trained on them are cleared (if there is no stamp yet, e.g. for a
+    # project set up before stamps were written, existing feature classes are kept)
+    stamp_file = os.path.join(data_path, f"{base_fc}_NC.stamp")
+    fw_hash = fileHash(fw_file)
+    stale = False
+    if os.path.isfile(stamp_file):
+        with open(stamp_file) as f:
+            stale = f.read().strip() != fw_hash
+    if stale:
+        brds = [Bird(dataframe=species, bird_name=n, _prefix=_prefix) for n in species.names]
+        stale_fcs = [fc for fc in [f"{base_fc}_NC"] + [brd.fc_name for brd in brds] 
+                     if fc in existing_fcs]
+        if stale_fcs:
+            print("FeederWatch data has changed; rebuilding bird feature classes...")
+            arcpy.AddMessage("FeederWatch data has changed; rebuilding bird feature classes...")
+            arcpy.management.Delete(";".join(stale_fcs))
+            existing_fcs.difference_update(stale_fcs)
+        for brd in brds:
+            if clearModelOutputs(brd.formatted_name, wspace, data_path, model_data=clear_model_data):
+                print(f"Cleared model outputs for {brd.name}; it will be retrained")
+                arcpy.AddMessage(f"Cleared model outputs for {brd.name}; it will be retrained")
     
     # Create base feature class
     if f"{base_fc}_NC" not in existing_fcs:
         
-        arcpy.management.XYTableToPoint(in_table=fw_file,
-                                        out_feature_class=base_fc,
-                                        x_field="longitude", 
-                                        y_field="latitude")
-        # Add projection to base FC
-        arcpy.Project_management(base_fc, f"{base_fc}_projected", out_coordinate_system)
+        # Write the (already loaded) FeederWatch data straight to an in-memory point 
+        # feature class with an insert cursor, rather than re-reading the .csv through 
+        # XYTableToPoint
+        points_fc = f"memory/{base_fc}"
+        arcpy.management.CreateFeatureclass("memory", 
+                                            base_fc, 
+                                            "POINT", 
+                                            spatial_reference=arcpy.SpatialReference(4326))
+        for field, field_type in FW_FIELDS.items():
+            arcpy.management.AddField(points_fc, field, field_type)
+        columns = [fw_df[field].astype(object).where(fw_df[field].notna(), None).to_numpy() 
+                   for field in FW_FIELDS.keys()]
+        columns[list(FW_FIELDS).index("date")] = [d.to_pydatetime() for d in pd.to_datetime(fw_df["date"])]
+        with arcpy.da.InsertCursor(points_fc, ["SHAPE@XY"] + list(FW_FIELDS)) as cursor:
+            for lon, lat, row in zip(fw_df["longitude"].to_numpy(), 
+                                     fw_df["latitude"].to_numpy(), 
+                                     zip(*columns)):
+                cursor.insertRow(((lon, lat),) + row)
 
-        arcpy.SelectLayerByLocation_management(f"{base_fc}_projected", 
-                                               "INTERSECT", 
-                                               nc_boundary)
+        points_lyr = arcpy.SelectLayerByLocation_management(points_fc, 
+                                                            "INTERSECT", 
+                                                            nc_boundary)
         
-        arcpy.CopyFeatures_management(f"{base_fc}_projected", 
-                                      f"{base_fc}_NC")
+        # Points are projected as they are copied, so no separate Project pass is needed
+        with arcpy.EnvManager(outputCoordinateSystem=out_coordinate_system):
+            arcpy.CopyFeatures_management(points_lyr, 
+                                          f"{base_fc}_NC")
         
-        # Delete unneeded feature layers
-        for fc in [base_fc, f"{base_fc}_projected"]:
-            arcpy.Delete_management(fc)
+        # Delete unneeded feature class
+        arcpy.Delete_management(points_fc)
+        existing_fcs.add(f"{base_fc}_NC")
 
     # Add to GDB by species
+    targets = dict()
     for species_name in fw_df.species_name.unique():
-        brd = Bird(dataframe=species_df, bird_name=species_name, _prefix=_prefix)
+        brd = Bird(dataframe=species, bird_name=species_name, _prefix=_prefix)
         if brd.fc_name not in existing_fcs:
             print(f'Adding {brd.name} to gdb...')
             arcpy.AddMessage(f'Adding {brd.name} to gdb...')
-            arcpy.analysis.Select(f"{base_fc}_NC", 
-                                  brd.fc_name, 
-                                  f"species_name = '{brd.name}'")
+            # Empty species feature class with the same schema/projection as the source
+            arcpy.management.CreateFeatureclass(wspace, 
+                                                brd.fc_name, 
+                                                "POINT", 
+                                                template=f"{base_fc}_NC", 
+                                                spatial_reference=out_coordinate_system)
+            targets[brd.name] = brd.fc_name
+            existing_fcs.add(brd.fc_name)
+
+    if targets:
+        # Read the source feature class once, dispatching each row to the insert
+        # cursor of its species (instead of one Select pass per species)
+        fields = ["SHAPE@"] + [f.name for f in arcpy.ListFields(f"{base_fc}_NC") 
+                               if f.editable and f.type not in ("OID", "Geometry")]
+        name_idx = fields.index("species_name")
+        # (the exit stack closes every insert cursor, releasing its lock, when the pass
+        # ends, including on errors)
+        with ExitStack() as stack:
+            cursors = {name: stack.enter_context(arcpy.da.InsertCursor(fc, fields)) 
+                       for name, fc in targets.items()}
+            with arcpy.da.SearchCursor(f"{base_fc}_NC", fields) as search:
+                for row in search:
+                    cursor = cursors.get(row[name_idx])
+                    if cursor is not None:
+                        cursor.insertRow(row)
+
+    # Record the data the feature classes were built from
+    with open(stamp_file, "w") as f:
+        f.write(fw_hash)
     
     print("Finished batch processing of bird data prior to analysis")
     arcpy.AddMessage("Finished batch processing of bird data prior to analysis")
\ No newline at end of file
@@ -25,120 +25,165 @@
 import sys
 import os
 import arcpy
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from get_bird_data import getSpeciesCodes, getFeederWatchData
 from get_nc_boundary import getNCBoundary
-from get_dem_data import getDEMData
-from get_land_cover_data import getLandCoverData
-from get_weather_data import getWeatherData
+from get_dem_data import getDEMData, downloadDEMData
+from get_land_cover_data import getLandCoverData, downloadLandCoverData
+from get_weather_data import getWeatherData, downloadWeatherData
 from process_bird_data import batchBirdProcessing
 from presence_only import batchMaxEnt
 from presence_only_mapping import outputMaxEntMaps
+from birds import Species
 
-# User Input
-try:
-    PROJ_PATH = os.path.dirname(os.path.abspath(sys.argv[1]))
-    PROJ_FILE = os.path.basename(sys.argv[1])
-    if not os.path.exists(os.path.join(PROJ_PATH, PROJ_FILE)): 
-        raise FileNotFoundError
-except:
-    print("Error: Please ensure you entered the correct path to the ArcGIS Project.")
-    sys.exit()
-
-if __name__ == "__main__":
-    ### Set up environment #####
-    print(f"Setting up environment in {PROJ_PATH}...")
-    DB_PATH = os.path.join(PROJ_PATH, "woodpeckerNC.gdb") # "woodpeckersNC.gdb"
-    if not os.path.exists(DB_PATH):
-        # Create File Geodatabase
-        arcpy.CreateFileGDB_management(PROJ_PATH, "woodpeckerNC.gdb")
-    arcpy.env.workspace = DB_PATH
-    print(f"Workspace set to {DB_PATH}")
-    DATA_PATH = os.path.join(PROJ_PATH, "data") # ./data
-    if not os.path.exists(DATA_PATH):
-        os.makedirs(DATA_PATH)
+def setupData(data_path:str, wspace:str) -> tuple:
+    """
+    Sets up the data for the analysis (shared by woodpeckers_nc.py and 
+    woodpeckers_nc_tool.py): the NC boundary, the FeederWatch woodpecker data (saved to
+    the GDB by species), and the land cover, DEM and weather explanatory rasters
+    Args
+    - data_path : A file path to the data directory
+    - wspace : A file path to the working directory/GDB (set as the arcpy workspace)
+    Output
+    Tuple of the NC boundary, a Species object of the woodpeckers observed in NC, and the
+    explanatory rasters (in the nested list format used by `batchMaxEnt()`)
+    """
+    arcpy.env.workspace = wspace
     _PREFIX = "FW_"
     _SUFFIX = "woodpeckers_NC"
     BASE_FC = f"{_PREFIX}{_SUFFIX}" # "FW_woodpeckers_NC"
     FW_FILE = f"{BASE_FC}.csv" # "FW_woodpeckers_NC.csv"
-    # Existing Feature Classes
-    existing_fcs = arcpy.ListFeatureClasses()
-    # Projected Coordinate System
-    coord_system = arcpy.SpatialReference("NAD 1983 StatePlane North Carolina FIPS 3200 (US Feet)")
-    # coord_system = arcpy.SpatialReference().loadFromString('PROJCS["NAD_1983_StatePlane_North_Carolina_FIPS_3200_Feet",GEOGCS["GCS_North_American_1983",DATUM["D_North_American_1983",SPHEROID["GRS_1980",6378137.0,298.257222101]],PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]],PROJECTION["Lambert_Conformal_Conic"],PARAMETER["False_Easting",2000000.002616666],PARAMETER["False_Northing",0.0],PARAMETER["Central_Meridian",-79.0],PARAMETER["Standard_Parallel_1",34.33333333333334],PARAMETER["Standard_Parallel_2",36.16666666666666],PARAMETER["Latitude_Of_Origin",33.75],UNIT["Foot_US",0.3048006096012192]]')
-
-    ### Get NC Boundary ##########
-    nc_boundary = getNCBoundary(data_path=DATA_PATH, 
-                                wspace=DB_PATH, 
-                                coord_sys=coord_system)
+    # Start downloading explanatory data concurrently in the background (network-bound, 
+    # no geoprocessing), overlapping with the boundary and bird data processing below
+    executor = ThreadPoolExecutor(max_workers=3)
+    try:
+        downloads = {executor.submit(f, data_path): name 
+                     for f, name in [(downloadLandCoverData, "Land cover"), 
+                                     (downloadDEMData, "DEM"), 
+                                     (downloadWeatherData, "Weather")]}
+        # Existing Feature Classes
+        existing_fcs = set(arcpy.ListFeatureClasses() or [])
+        # Projected Coordinate System
+        coord_system = arcpy.SpatialReference("NAD 1983 StatePlane North Carolina FIPS 3200 (US Feet)")
+        # coord_system = arcpy.SpatialReference().loadFromString('PROJCS["NAD_1983_StatePlane_North_Carolina_FIPS_3200_Feet",GEOGCS["GCS_North_American_1983",DATUM["D_North_American_1983",SPHEROID["GRS_1980",6378137.0,298.257222101]],PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]],PROJECTION["Lambert_Conformal_Conic"],PARAMETER["False_Easting",2000000.002616666],PARAMETER["False_Northing",0.0],PARAMETER["Central_Meridian",-79.0],PARAMETER["Standard_Parallel_1",34.33333333333334],PARAMETER["Standard_Parallel_2",36.16666666666666],PARAMETER["Latitude_Of_Origin",33.75],UNIT["Foot_US",0.3048006096012192]]')
+
+        ### Get NC Boundary ##########
+        nc_boundary = getNCBoundary(data_path=data_path, 
+                                    wspace=wspace, 
+                                    coord_sys=coord_system)
     
-    ### Get FeederWatch data #####
+        ### Get FeederWatch data #####
    
-    # Select 2017 - 2019 (Covered by 2019 Land Cover Raster)
-    DATA_TIMEFRAMES = ['2016_2020']
-    # All Species
-    SPECIES = getSpeciesCodes(data_path=DATA_PATH)
-    # Woodpecker Family
-    WOODPECKERS = SPECIES.loc[SPECIES['family'] == 'Picidae (Woodpeckers)']
-
-    fw = getFeederWatchData(outfile=FW_FILE,
-                            tfs=DATA_TIMEFRAMES,
-                            birds=WOODPECKERS,
-                            sub_national_code=['US-NC'],
-                            out_dir=DATA_PATH,
-                            file_suffix=_SUFFIX,
-                            save_=True,
-                            min_year=2017,
-                            max_year=2019)
+        # Select 2017 - 2019 (Covered by 2019 Land Cover Raster)
+        DATA_TIMEFRAMES = ['2016_2020']
+        # All Species
+        SPECIES = getSpeciesCodes(data_path=data_path)
+        # Woodpecker Family
+        WOODPECKERS = SPECIES.loc[SPECIES['family'] == 'Picidae (Woodpeckers)']
+
+        fw = getFeederWatchData(outfile=FW_FILE,
+                                tfs=DATA_TIMEFRAMES,
+                                birds=WOODPECKERS,
+                                sub_national_code=['US-NC'],
+                                out_dir=data_path,
+                                file_suffix=_SUFFIX,
+                                save_=True,
+                                min_year=2017,
+                                max_year=2019)
     
-    ### Process Data (including explanatory variables); set up GDB #####
-
-    # Batch process by species type, for woodpecker family in NC
-    batchBirdProcessing(fw_file=FW_FILE, 
-                        base_fc=BASE_FC,
-                        existing_fcs=existing_fcs, 
-                        out_coordinate_system=coord_system,
-                        data_path=DATA_PATH,
-                        wspace=DB_PATH,
-                        fw_df=fw,
-                        species_df=WOODPECKERS,
-                        _prefix=_PREFIX,
-                        nc_boundary=nc_boundary)
+        ### Process Data (including explanatory variables); set up GDB #####
+
+        # Batch process by species type, for woodpecker family in NC
+        batchBirdProcessing(fw_file=FW_FILE, 
+                            base_fc=BASE_FC,
+                            existing_fcs=existing_fcs, 
+                            out_coordinate_system=coord_system,
+                            data_path=data_path,
+                            wspace=wspace,
+                            fw_df=fw,
+                            species_df=WOODPECKERS,
+                            _prefix=_PREFIX,
+                            nc_boundary=nc_boundary)
     
+        # Wait for the explanatory data downloads started above; the arcpy processing of
+        # each dataset below then runs sequentially. (The download workers only print; 
+        # arcpy messages are sent from this thread)
+        for download in as_completed(downloads):
+            msg = f"{downloads[download]} data downloaded to {download.result()}"
+            print(msg)
+            arcpy.AddMessage(msg)
+    finally:
+        # If the processing above fails, cancel queued downloads rather than waiting here
+        # (downloads already running finish in their worker threads)
+        executor.shutdown(wait=False, cancel_futures=True)
+
     # Get land cover raster data; Resample to GDB
-    land_cover_data = getLandCoverData(data_path=DATA_PATH, 
-                                       wspace=DB_PATH, 
+    land_cover_data = getLandCoverData(data_path=data_path, 
+                                       wspace=wspace, 
                                        coord_sys=coord_system,
                                        nc_boundary=nc_boundary)
     # Get DEM data; Copy to GDB
-    dem_data = getDEMData(data_path=DATA_PATH, 
-                          wspace=DB_PATH, 
+    dem_data = getDEMData(data_path=data_path, 
+                          wspace=wspace, 
                           coord_sys=coord_system, 
                           nc_boundary=nc_boundary)
     # Get Weather raster data; Aggregate in GDB
-    avg_prec_data, min_temp_data, max_temp_data = getWeatherData(data_path=DATA_PATH, 
-                                                                 wspace=DB_PATH,
+    avg_prec_data, min_temp_data, max_temp_data = getWeatherData(data_path=data_path, 
+                                                                 wspace=wspace,
                                                                  nc_boundary=nc_boundary,
                                                                  coord_system=coord_system)
 
-    ### Analyze ###
+    ### Explanatory rasters / NC species for the analysis #####
 
     NC_WOODPECKERS = WOODPECKERS.loc[WOODPECKERS.species_name.isin(fw.species_name.unique())]
+    # Species lookup shared by the modeling and mapping steps
+    NC_SPECIES = Species(NC_WOODPECKERS)
     explanatory_data = [land_cover_data, dem_data, avg_prec_data, min_temp_data, max_temp_data]
     explanatory_rasters = [[dat, "true" if dat == land_cover_data else "false"] for dat in explanatory_data]
 
-    batchMaxEnt(species_df=NC_WOODPECKERS, 
-                wspace=DB_PATH, 
-                data_path=DATA_PATH, 
-                explanatory_rasters=explanatory_rasters,
-                nc_boundary=nc_boundary)
+    return nc_boundary, NC_SPECIES, explanatory_rasters
+
+if __name__ == "__main__":
+    ### User Input #####
+    try:
+        PROJ_PATH = os.path.dirname(os.path.abspath(sys.argv[1]))
+        PROJ_FILE = os.path.basename(sys.argv[1])
+        if not os.path.exists(os.path.join(PROJ_PATH, PROJ_FILE)): 
+            raise FileNotFoundError
+    except:
+        print("Error: Please ensure you entered the correct path to the ArcGIS Project.")
+        sys.exit()
+
+    ### Set up environment #####
+    print(f"Setting up environment in {PROJ_PATH}...")
+    DB_PATH = os.path.join(PROJ_PATH, "woodpeckerNC.gdb") # "woodpeckersNC.gdb"
+    if not os.path.exists(DB_PATH):
+        # Create File Geodatabase
+        arcpy.CreateFileGDB_management(PROJ_PATH, "woodpeckerNC.gdb")
+    arcpy.env.workspace = DB_PATH
+    print(f"Workspace set to {DB_PATH}")
+    DATA_PATH = os.path.join(PROJ_PATH, "data") # ./data
+    if not os.path.exists(DATA_PATH):
+        os.makedirs(DATA_PATH)
+    ### Data setup #####
+    nc_boundary, NC_SPECIES, explanatory_rasters = setupData(data_path=DATA_PATH, wspace=DB_PATH)
+
+    ### Analyze ###
+
+    retrained = batchMaxEnt(species_df=NC_SPECIES, 
+                            wspace=DB_PATH, 
+                            data_path=DATA_PATH, 
+                            explanatory_rasters=explanatory_rasters,
+                            nc_boundary=nc_boundary)
     
     ### Mapping ##########
 
-    outputMaxEntMaps(species_df=NC_WOODPECKERS, 
+    outputMaxEntMaps(species_df=NC_SPECIES, 
                      project_path=os.path.join(PROJ_PATH, PROJ_FILE), 
                      wspace=DB_PATH, 
                      data_path=DATA_PATH, 
                      output_folder=os.path.join(DATA_PATH, "maps"),
-                     tool_script=False)
+                     tool_script=False,
+                     refresh=retrained)
 
     print("Finished running woodpeckers_nc.py")